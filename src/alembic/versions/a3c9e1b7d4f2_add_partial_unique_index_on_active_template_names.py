@@ -0,0 +1,31 @@
+"""Add partial unique index on active template names
+
+Revision ID: a3c9e1b7d4f2
+Revises: f6d86428f428
+Create Date: 2026-10-15 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c9e1b7d4f2'
+down_revision: Union[str, None] = 'f6d86428f428'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'uq_template_name_active', 'templates', ['name'],
+        unique=True,
+        postgresql_where=sa.text('is_active'),
+        sqlite_where=sa.text('is_active')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_template_name_active', table_name='templates')
@@ -0,0 +1,51 @@
+"""Use JSONB for template field definitions
+
+Revision ID: c71f0e52b8a9
+Revises: a3c9e1b7d4f2
+Create Date: 2026-10-15 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'c71f0e52b8a9'
+down_revision: Union[str, None] = 'a3c9e1b7d4f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # JSONB 與 GIN 索引僅適用於 PostgreSQL，SQLite 維持 JSON
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.alter_column(
+        'templates', 'field_definitions',
+        type_=JSONB(),
+        existing_type=sa.JSON(),
+        existing_nullable=False,
+        postgresql_using='field_definitions::jsonb'
+    )
+    op.create_index(
+        'idx_template_fields_gin', 'templates', ['field_definitions'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'field_definitions': 'jsonb_path_ops'}
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('idx_template_fields_gin', table_name='templates')
+    op.alter_column(
+        'templates', 'field_definitions',
+        type_=sa.JSON(),
+        existing_type=JSONB(),
+        existing_nullable=False,
+        postgresql_using='field_definitions::json'
+    )
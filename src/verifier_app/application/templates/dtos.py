@@ -4,7 +4,7 @@
 
 from typing import List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 class BoundingBoxDto(BaseModel):
@@ -13,6 +13,12 @@ class BoundingBoxDto(BaseModel):
     x2: float
     y2: float
 
+    @model_validator(mode="after")
+    def check_coordinates(self) -> "BoundingBoxDto":
+        if self.x1 >= self.x2 or self.y1 >= self.y2:
+            raise ValueError("Invalid bounding box coordinates")
+        return self
+
 
 class FieldDefinitionCreateDto(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
@@ -17,6 +17,8 @@ class Settings(BaseSettings):
 
     # Redis
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    # 多個 worker 行程時以 Redis pub/sub 轉送 WebSocket 推播
+    WS_REDIS_BACKPLANE: bool = os.getenv("WS_REDIS_BACKPLANE", "false").lower() == "true"
 
     # 文件儲存相關
     STORAGE_PATH: str = os.getenv("STORAGE_PATH", "./src/storage/documents")
@@ -40,6 +42,7 @@ class Settings(BaseSettings):
     
     # 文件處理配置
     MAX_FILE_SIZE_MB: int = int(os.getenv("MAX_FILE_SIZE_MB", "50"))
+    UPLOAD_CONCURRENCY: int = int(os.getenv("UPLOAD_CONCURRENCY", "8"))  # 多檔上傳同時處理數量
     SUPPORTED_FILE_TYPES: list = ["pdf", "jpg", "jpeg", "png", "tiff", "bmp"]
     DEFAULT_CONFIDENCE_THRESHOLD: float = float(os.getenv("DEFAULT_CONFIDENCE_THRESHOLD", "0.8"))
     
@@ -6,15 +6,29 @@ import logging
 import shutil
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, BinaryIO, Dict, Optional
 
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from minio import Minio
 from minio.error import S3Error
+from starlette.concurrency import run_in_threadpool
 
 logger = logging.getLogger(__name__)
 
+# 串流上傳的分塊大小
+STREAM_CHUNK_SIZE = 1024 * 1024
+# MinIO 分段上傳的每段大小（最小 5 MiB）
+MINIO_PART_SIZE = 10 * 1024 * 1024
+
+
+def _copy_to_path(file_obj: BinaryIO, destination: Path) -> None:
+    """建立目標目錄並分塊複製，不將整個檔案載入記憶體"""
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    with open(destination, 'wb') as f:
+        shutil.copyfileobj(file_obj, f, STREAM_CHUNK_SIZE)
+
 
 class StorageAdapter(ABC):
     """儲存適配器基礎類別"""
@@ -29,6 +43,11 @@ class StorageAdapter(ABC):
         """上傳檔案內容"""
         pass
     
+    @abstractmethod
+    async def upload_file_stream(self, file_obj: BinaryIO, storage_path: str) -> str:
+        """以串流方式上傳檔案物件"""
+        pass
+    
     @abstractmethod
     async def download_file(self, storage_path: str, local_path: str) -> bool:
         """下載檔案"""
@@ -97,6 +116,21 @@ class LocalStorageAdapter(StorageAdapter):
             logger.error(f"Failed to upload file content {storage_path}: {e}")
             raise
     
+    async def upload_file_stream(self, file_obj: BinaryIO, storage_path: str) -> str:
+        """以串流方式上傳檔案物件到本地儲存"""
+        try:
+            destination = self.base_path / storage_path
+            
+            # 檔案 I/O 為阻塞操作，移至執行緒池避免阻塞事件迴圈
+            await run_in_threadpool(_copy_to_path, file_obj, destination)
+            
+            logger.info(f"File stream uploaded: {storage_path}")
+            return str(destination)
+            
+        except Exception as e:
+            logger.error(f"Failed to upload file stream {storage_path}: {e}")
+            raise
+    
     async def download_file(self, storage_path: str, local_path: str) -> bool:
         """從本地儲存下載檔案"""
         try:
@@ -170,9 +204,11 @@ class S3StorageAdapter(StorageAdapter):
             region_name=region_name
         )
         
+        # 加大連線池並固定 SigV4，讓上傳與預簽 URL 共用保持連線的客戶端
         self.s3_client = session.client(
             's3',
-            endpoint_url=endpoint_url
+            endpoint_url=endpoint_url,
+            config=Config(max_pool_connections=64, signature_version='s3v4')
         )
         
         # 驗證 bucket 存在
@@ -209,6 +245,22 @@ class S3StorageAdapter(StorageAdapter):
             logger.error(f"Failed to upload file content to S3 {storage_path}: {e}")
             raise
     
+    async def upload_file_stream(self, file_obj: BinaryIO, storage_path: str) -> str:
+        """以串流方式上傳檔案物件到 S3（大檔案自動使用分段上傳）"""
+        try:
+            # boto3 為同步客戶端，移至執行緒池避免阻塞事件迴圈
+            await run_in_threadpool(
+                self.s3_client.upload_fileobj, file_obj, self.bucket_name, storage_path
+            )
+            
+            storage_url = f"s3://{self.bucket_name}/{storage_path}"
+            logger.info(f"File stream uploaded to S3: {storage_path}")
+            return storage_url
+            
+        except ClientError as e:
+            logger.error(f"Failed to upload file stream to S3 {storage_path}: {e}")
+            raise
+    
     async def download_file(self, storage_path: str, local_path: str) -> bool:
         """從 S3 下載檔案"""
         try:
@@ -314,6 +366,27 @@ class MinIOStorageAdapter(StorageAdapter):
             logger.error(f"Failed to upload file content to MinIO {storage_path}: {e}")
             raise
     
+    async def upload_file_stream(self, file_obj: BinaryIO, storage_path: str) -> str:
+        """以串流方式上傳檔案物件到 MinIO（長度未知時使用分段上傳）"""
+        try:
+            # MinIO 客戶端為同步呼叫，移至執行緒池避免阻塞事件迴圈
+            await run_in_threadpool(
+                self.client.put_object,
+                self.bucket_name,
+                storage_path,
+                file_obj,
+                length=-1,
+                part_size=MINIO_PART_SIZE
+            )
+            
+            storage_url = f"minio://{self.bucket_name}/{storage_path}"
+            logger.info(f"File stream uploaded to MinIO: {storage_path}")
+            return storage_url
+            
+        except S3Error as e:
+            logger.error(f"Failed to upload file stream to MinIO {storage_path}: {e}")
+            raise
+    
     async def download_file(self, storage_path: str, local_path: str) -> bool:
         """從 MinIO 下載檔案"""
         try:
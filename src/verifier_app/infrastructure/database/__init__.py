@@ -2,13 +2,16 @@
 資料庫基礎設施模組
 """
 
-from .base import Base, get_database_session, init_database
+from .base import (Base, get_async_session, get_database_session,
+                   init_async_database, init_database)
 from .models import Document, Template, VerificationRecord
 
 __all__ = [
     "Base",
     "get_database_session", 
+    "get_async_session",
     "init_database",
+    "init_async_database",
     "Document",
     "Template", 
     "VerificationRecord"
@@ -3,12 +3,16 @@
 """
 
 import logging
-from typing import Any, Generator
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Generator
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (AsyncSession, async_sessionmaker,
+                                    create_async_engine)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import Session, sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 
 from ...core.config import settings
 
@@ -21,6 +25,16 @@ Base = declarative_base()
 engine = None
 SessionLocal = None
 
+# 全域非同步資料庫引擎和會話
+async_engine = None
+AsyncSessionLocal = None
+
+# 各資料庫對應的非同步驅動
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
+
 
 def init_database() -> None:
     """初始化資料庫連線"""
@@ -41,8 +55,10 @@ def init_database() -> None:
         # PostgreSQL 或其他資料庫配置（生產環境）
         engine = create_engine(
             settings.DATABASE_URL,
+            pool_size=20,
+            max_overflow=40,
             pool_pre_ping=True,
-            pool_recycle=300,
+            pool_recycle=1800,
             echo=settings.DEBUG_MODE
         )
     
@@ -74,3 +90,62 @@ def get_sync_session() -> Session:
         init_database()
     
     return SessionLocal()
+
+
+def get_async_database_url(database_url: str) -> str:
+    """將資料庫 URL 轉換為對應的非同步驅動 URL"""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    driver = ASYNC_DRIVERS.get(backend)
+    if driver is None:
+        return database_url
+    return url.set(drivername=f"{backend}+{driver}").render_as_string(hide_password=False)
+
+
+def init_async_database() -> None:
+    """初始化非同步資料庫連線"""
+    global async_engine, AsyncSessionLocal
+    
+    database_url = get_async_database_url(settings.DATABASE_URL)
+    
+    if database_url.startswith("sqlite"):
+        # SQLite 配置（開發環境）
+        # 僅記憶體資料庫需共用單一連線（StaticPool）；檔案資料庫每個會話使用獨立連線，
+        # 避免並行會話共用同一交易（一方的 commit/rollback 影響另一方）
+        in_memory = make_url(database_url).database in (None, "", ":memory:")
+        async_engine = create_async_engine(
+            database_url,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool if in_memory else NullPool,
+            echo=settings.DEBUG_MODE
+        )
+    else:
+        # PostgreSQL 配置（生產環境）
+        async_engine = create_async_engine(
+            database_url,
+            pool_size=20,
+            max_overflow=40,
+            pool_pre_ping=True,
+            pool_recycle=1800,
+            echo=settings.DEBUG_MODE
+        )
+    
+    # expire_on_commit=False：提交後仍可讀取屬性，避免非同步環境下的延遲載入
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine,
+        class_=AsyncSession,
+        autoflush=False,
+        expire_on_commit=False
+    )
+    
+    logger.info("Async database initialized")
+
+
+@asynccontextmanager
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    """取得非同步資料庫會話（離開區塊時自動關閉）"""
+    if AsyncSessionLocal is None:
+        init_async_database()
+    
+    async with AsyncSessionLocal() as session:
+        yield session
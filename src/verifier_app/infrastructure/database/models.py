@@ -9,7 +9,9 @@ from typing import Any, Dict, Optional
 from uuid import UUID, uuid4
 
 from sqlalchemy import (JSON, Boolean, Column, DateTime, Enum, Float,
-                        ForeignKey, Index, Integer, LargeBinary, String, Text)
+                        ForeignKey, Index, Integer, LargeBinary, String, Text,
+                        text)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.dialects.postgresql import UUID as PostgresUUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -145,7 +147,7 @@ class Template(Base):
     version = Column(String(20), default="1.0")
     
     # 模板配置
-    field_definitions = Column(JSON, nullable=False)  # 欄位定義和驗證規則
+    field_definitions = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False)  # 欄位定義和驗證規則（PostgreSQL 使用 JSONB）
     validation_rules = Column(JSON)  # 驗證規則配置
     ocr_regions = Column(JSON)  # OCR 區域定義
     
@@ -167,6 +169,19 @@ class Template(Base):
     # 索引
     __table_args__ = (
         Index('idx_template_type_active', 'template_type', 'is_active'),
+        # 啟用中的範本名稱不可重複（部分唯一索引）
+        Index(
+            'uq_template_name_active', 'name',
+            unique=True,
+            postgresql_where=text('is_active'),
+            sqlite_where=text('is_active')
+        ),
+        # 欄位定義的 JSONB 包含查詢（@>）索引
+        Index(
+            'idx_template_fields_gin', 'field_definitions',
+            postgresql_using='gin',
+            postgresql_ops={'field_definitions': 'jsonb_path_ops'}
+        ),
     )
 
 
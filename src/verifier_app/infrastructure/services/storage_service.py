@@ -5,7 +5,7 @@
 import asyncio
 import logging
 from pathlib import Path
-from typing import AsyncGenerator, Optional, Tuple
+from typing import AsyncGenerator, BinaryIO, Optional, Tuple
 
 from ...core.config import settings
 from ...domains.documents.models import Document
@@ -76,6 +76,10 @@ class StorageService(AbstractStorageService):
         """上傳檔案內容"""
         return await self.adapter.upload_file_content(file_content, storage_path)
     
+    async def upload_file_stream(self, file_obj: BinaryIO, storage_path: str) -> str:
+        """以串流方式上傳檔案物件"""
+        return await self.adapter.upload_file_stream(file_obj, storage_path)
+    
     async def download_file(self, storage_path: str, local_path: str) -> bool:
         """下載檔案"""
         return await self.adapter.download_file(storage_path, local_path)
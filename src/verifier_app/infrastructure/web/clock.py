@@ -0,0 +1,24 @@
+"""
+秒級時間戳記快取
+"""
+
+import time
+from datetime import datetime, timezone
+
+_cached_second = -1
+_cached_iso = ""
+
+
+def utc_now_iso() -> str:
+    """
+    回傳目前 UTC 時間的 ISO 8601 字串（秒級精度）
+
+    同一秒內重複呼叫直接回傳快取字串，省去日期拆解與格式化；
+    格式與 datetime.utcnow().isoformat() 相同但不含微秒。
+    """
+    global _cached_second, _cached_iso
+    now = int(time.time())
+    if now != _cached_second:
+        _cached_iso = datetime.fromtimestamp(now, timezone.utc).replace(tzinfo=None).isoformat()
+        _cached_second = now
+    return _cached_iso
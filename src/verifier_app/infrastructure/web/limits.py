@@ -0,0 +1,89 @@
+"""
+請求大小限制中介層
+"""
+
+import logging
+
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+
+class _BodyTooLarge(HTTPException):
+    """以 HTTPException 形式拋出，讓路由內讀取主體時由例外處理器回應 413"""
+
+    def __init__(self, max_body_size: int):
+        super().__init__(
+            status_code=413,
+            detail=f"Request body exceeds maximum allowed size {max_body_size}"
+        )
+
+
+class BodySizeLimitMiddleware:
+    """
+    限制 HTTP 請求主體大小
+
+    Content-Length 超過上限時在讀取主體前直接回應 413；
+    未提供 Content-Length（分塊傳輸）時邊接收邊累計，超過上限即中止。
+    """
+
+    def __init__(self, app: ASGIApp, max_body_size: int):
+        self.app = app
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    content_length = int(value)
+                except ValueError:
+                    await self._bad_request(scope, receive, send)
+                    return
+                if content_length > self.max_body_size:
+                    await self._reject(scope, receive, send)
+                    return
+                break
+
+        received = 0
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    raise _BodyTooLarge(self.max_body_size)
+            return message
+
+        async def tracking_send(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except _BodyTooLarge:
+            if response_started:
+                raise
+            await self._reject(scope, receive, send)
+
+    async def _bad_request(self, scope: Scope, receive: Receive, send: Send) -> None:
+        logger.warning(f"Rejected request with invalid Content-Length: {scope.get('path')}")
+        response = JSONResponse({"detail": "Invalid Content-Length header"}, status_code=400)
+        await response(scope, receive, send)
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send) -> None:
+        logger.warning(f"Rejected request body larger than {self.max_body_size} bytes: {scope.get('path')}")
+        response = JSONResponse(
+            {"detail": f"Request body exceeds maximum allowed size {self.max_body_size}"},
+            status_code=413
+        )
+        await response(scope, receive, send)
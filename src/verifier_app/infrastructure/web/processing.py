@@ -211,14 +211,6 @@ async def process_document_async_endpoint(
         if not file.filename:
             raise HTTPException(status_code=400, detail="No file provided")
         
-        # 讀取檔案內容
-        file_content = await file.read()
-        if not file_content:
-            raise HTTPException(status_code=400, detail="Empty file")
-        
-        # 先同步建立文件記錄和上傳檔案
-        processor = DocumentProcessor()
-        
         # 只進行基本處理（上傳檔案，不執行 OCR）
         import hashlib
         from pathlib import Path
@@ -227,42 +219,47 @@ async def process_document_async_endpoint(
         from ..database.base import get_sync_session
         from ..database.models import Document, DocumentStatus
 
-        # 計算檔案雜湊
-        file_hash = hashlib.sha256(file_content).hexdigest()
-        
-        # 建立文件記錄
+        # 分塊計算檔案雜湊與大小，避免整個檔案載入記憶體
+        hasher = hashlib.sha256()
+        file_size = 0
+        while chunk := await file.read(1024 * 1024):
+            hasher.update(chunk)
+            file_size += len(chunk)
+        if not file_size:
+            raise HTTPException(status_code=400, detail="Empty file")
+        await file.seek(0)
+        file_hash = hasher.hexdigest()
+
+        # 先同步建立文件記錄和上傳檔案
+        processor = DocumentProcessor()
+
+        # 建立文件記錄並上傳檔案
         db = get_sync_session()
-        document_id = uuid4()
-        document = Document(
-            id=document_id,
-            filename=f"{document_id}{Path(file.filename).suffix}",
-            original_filename=file.filename,
-            content_type=processor._get_content_type(Path(file.filename).suffix.lower().lstrip('.')),
-            file_size=len(file_content),
-            file_hash=file_hash,
-            status=DocumentStatus.UPLOADED,
-            storage_provider="local"
-        )
-        
-        db.add(document)
-        db.commit()
-        
-        # 上傳檔案
-        import tempfile
-        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(file.filename).suffix) as tmp_file:
-            tmp_file.write(file_content)
-            temp_path = tmp_file.name
-        
         try:
+            document_id = uuid4()
+            document = Document(
+                id=document_id,
+                filename=f"{document_id}{Path(file.filename).suffix}",
+                original_filename=file.filename,
+                content_type=processor._get_content_type(Path(file.filename).suffix.lower().lstrip('.')),
+                file_size=file_size,
+                file_hash=file_hash,
+                status=DocumentStatus.UPLOADED,
+                storage_provider="local"
+            )
+
+            db.add(document)
+            db.commit()
+
+            # 上傳檔案：直接串流 UploadFile 底層的 SpooledTemporaryFile
             storage_path = processor.storage_service.generate_storage_path(file.filename, str(document_id))
-            await processor.storage_service.upload_file(temp_path, storage_path)
-            
+            await processor.storage_service.upload_file_stream(file.file, storage_path)
+
             # 更新文件記錄
             document.storage_path = storage_path
             db.commit()
-            
+
         finally:
-            Path(temp_path).unlink(missing_ok=True)
             db.close()
         
         # 提交背景任務
@@ -431,6 +428,7 @@ async def get_template_table_info(template_id: str):
     
     返回資料表結構和基本資訊
     """
+    db = None
     try:
         from ..database.base import get_sync_session
         from ..database.models import Template
@@ -445,8 +443,6 @@ async def get_template_table_info(template_id: str):
         if template.validation_rules and 'data_table' in template.validation_rules:
             table_info = template.validation_rules['data_table']
         
-        db.close()
-        
         return {
             "template_id": template_id,
             "template_name": template.name,
@@ -460,3 +456,6 @@ async def get_template_table_info(template_id: str):
     except Exception as e:
         logger.error(f"Failed to get template table info: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
+    finally:
+        if db:
+            db.close()
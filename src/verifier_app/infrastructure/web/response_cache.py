@@ -0,0 +1,81 @@
+"""
+程序內回應快取
+
+快取存在各 worker 行程內；多 worker 部署時須啟用 Redis 背景通道
+（settings.WS_REDIS_BACKPLANE），clear() 才會同步清除其他行程的快取，
+否則其他行程最多在 TTL 內回傳舊資料。
+"""
+
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+_MISSING = object()
+
+
+class ResponseCache:
+    """依命名空間分組的 TTL 快取，容量滿時淘汰命中次數最少（LFU）的項目"""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        # namespace -> key -> [expires_at, hits, value]
+        self._entries: Dict[str, Dict[Hashable, List[Any]]] = {}
+        # 清除時通知其他行程的回呼（由 Redis 背景通道啟動時設定）
+        self.on_clear: Optional[Callable[[Optional[str]], None]] = None
+
+    def get(self, namespace: str, key: Hashable, default: Any = _MISSING) -> Any:
+        entry = self._entries.get(namespace, {}).get(key)
+        if entry is None:
+            return default
+        if entry[0] < time.monotonic():
+            del self._entries[namespace][key]
+            return default
+        entry[1] += 1
+        return entry[2]
+
+    def set(self, namespace: str, key: Hashable, value: Any, expire: float) -> None:
+        entries = self._entries.setdefault(namespace, {})
+        if key not in entries and len(entries) >= self.maxsize:
+            self._evict(entries)
+        entries[key] = [time.monotonic() + expire, 0, value]
+
+    def clear(self, namespace: Optional[str] = None, propagate: bool = True) -> None:
+        """清除指定命名空間（未指定則全部清除）；propagate 時一併通知其他行程"""
+        if namespace is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(namespace, None)
+        if propagate and self.on_clear is not None:
+            self.on_clear(namespace)
+
+    @staticmethod
+    def _evict(entries: Dict[Hashable, List[Any]]) -> None:
+        now = time.monotonic()
+        expired = [key for key, entry in entries.items() if entry[0] < now]
+        if expired:
+            for key in expired:
+                del entries[key]
+            return
+        victim = min(entries, key=lambda key: entries[key][1])
+        del entries[victim]
+
+
+response_cache = ResponseCache()
+
+
+def cached(namespace: str, expire: float) -> Callable:
+    """快取非同步路由處理函式的回傳值，以呼叫參數作為鍵"""
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            key: Tuple = (func.__name__, args, tuple(sorted(kwargs.items())))
+            value = response_cache.get(namespace, key)
+            if value is _MISSING:
+                value = await func(*args, **kwargs)
+                response_cache.set(namespace, key, value, expire)
+            return value
+
+        return wrapper
+
+    return decorator
@@ -2,12 +2,26 @@
 系統設定路由
 """
 
+import asyncio
 import logging
+import platform
+import time
+from datetime import datetime
 from typing import Any, Dict, Optional
 
-from fastapi import APIRouter, HTTPException
+import httpx
+import orjson
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
 
+from .response_cache import cached
+
+try:
+    import psutil
+except ImportError:  # psutil 為選用套件，未安裝時停用資源監控
+    psutil = None
+
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
@@ -41,12 +55,97 @@ class ProviderSettings(BaseModel):
 processing_config = ProcessingSettings()
 provider_config = ProviderSettings()
 
+# 預先序列化的設定 JSON；更新時整個替換（copy-on-write），讀取端不需加鎖
+_processing_blob: bytes = orjson.dumps(processing_config.model_dump())
+_provider_blob: bytes = orjson.dumps(provider_config.model_dump())
+_settings_lock = asyncio.Lock()
+
+# 平台資訊在程序生命週期內不變，於載入時計算一次
+_PLATFORM = {
+    "system": platform.system(),
+    "release": platform.release(),
+    "machine": platform.machine(),
+    "python_version": platform.python_version()
+}
+
+# CPU 使用率由背景任務定期取樣，避免在請求中阻塞
+CPU_SAMPLE_INTERVAL_SECONDS = 5
+_cpu_percent: Optional[float] = None
+_cpu_sampler_task: Optional[asyncio.Task] = None
+
+
+async def _sample_cpu_percent() -> None:
+    global _cpu_percent
+    
+    # 第一次呼叫只建立基準值
+    psutil.cpu_percent(interval=None)
+    while True:
+        await asyncio.sleep(CPU_SAMPLE_INTERVAL_SECONDS)
+        _cpu_percent = psutil.cpu_percent(interval=None)
+
+
+def start_resource_sampler() -> None:
+    """啟動背景 CPU 取樣任務（psutil 未安裝時略過）"""
+    global _cpu_sampler_task
+    if _cpu_sampler_task is not None:
+        return
+    if psutil is None:
+        logger.warning("psutil not installed, resource monitoring disabled")
+        return
+    _cpu_sampler_task = asyncio.create_task(_sample_cpu_percent())
+
+
+def stop_resource_sampler() -> None:
+    """停止背景 CPU 取樣任務"""
+    global _cpu_sampler_task
+    if _cpu_sampler_task is not None:
+        _cpu_sampler_task.cancel()
+        _cpu_sampler_task = None
+
+
+# 健康檢查共用的 HTTP 客戶端（重用連線，避免每次 TLS 握手）
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient()
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """關閉健康檢查用的 HTTP 客戶端"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+async def _probe(config: Dict[str, Any]) -> Dict[str, Any]:
+    """檢查單一供應商的健康狀態"""
+    if not config.get("enabled", True):
+        return {"status": "disabled"}
+    
+    started = time.perf_counter()
+    response = await asyncio.wait_for(
+        _get_http_client().get(config["health_url"]),
+        timeout=config.get("timeout", 5)
+    )
+    result = {
+        "status": "healthy" if response.status_code < 400 else "unhealthy",
+        "response_time_ms": int((time.perf_counter() - started) * 1000)
+    }
+    if response.status_code >= 400:
+        result["error"] = f"HTTP {response.status_code}"
+    return result
+
 
 @router.get("/settings/processing", response_model=ProcessingSettings)
 async def get_processing_settings():
     """取得處理設定"""
     try:
-        return processing_config
+        return Response(content=_processing_blob, media_type="application/json")
     except Exception as e:
         logger.error(f"Failed to get processing settings: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -56,14 +155,17 @@ async def get_processing_settings():
 async def update_processing_settings(settings: ProcessingSettings):
     """更新處理設定"""
     try:
-        global processing_config
-        processing_config = settings
+        global processing_config, _processing_blob
+        blob = orjson.dumps(settings.model_dump())
+        async with _settings_lock:
+            processing_config = settings
+            _processing_blob = blob
         
         # TODO: 實作設定持久化
         # config_service.save_processing_settings(settings)
         
         logger.info("Updated processing settings")
-        return processing_config
+        return Response(content=blob, media_type="application/json")
         
     except Exception as e:
         logger.error(f"Failed to update processing settings: {e}")
@@ -74,7 +176,7 @@ async def update_processing_settings(settings: ProcessingSettings):
 async def get_provider_settings():
     """取得供應商設定"""
     try:
-        return provider_config
+        return Response(content=_provider_blob, media_type="application/json")
     except Exception as e:
         logger.error(f"Failed to get provider settings: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -84,15 +186,18 @@ async def get_provider_settings():
 async def update_provider_settings(settings: ProviderSettings):
     """更新供應商設定"""
     try:
-        global provider_config
-        provider_config = settings
+        global provider_config, _provider_blob
+        blob = orjson.dumps(settings.model_dump())
+        async with _settings_lock:
+            provider_config = settings
+            _provider_blob = blob
         
         # TODO: 實作設定持久化和供應商重新初始化
         # config_service.save_provider_settings(settings)
         # provider_manager.reload_providers(settings)
         
         logger.info("Updated provider settings")
-        return provider_config
+        return Response(content=blob, media_type="application/json")
         
     except Exception as e:
         logger.error(f"Failed to update provider settings: {e}")
@@ -101,23 +206,39 @@ async def update_provider_settings(settings: ProviderSettings):
 
 @router.post("/settings/providers/health-check")
 async def check_provider_health():
-    """檢查所有供應商健康狀態"""
+    """
+    檢查所有供應商健康狀態
+    
+    只檢查設定了 health_url 的供應商；內建預設設定皆未提供 health_url，
+    須先透過 PUT /settings/providers 設定後，結果中才會出現對應供應商。
+    """
     try:
-        # TODO: 實作供應商健康檢查
-        health_status = {
-            "ocr_providers": {
-                "tesseract": {"status": "healthy", "response_time_ms": 150},
-                "easyocr": {"status": "healthy", "response_time_ms": 200}
-            },
-            "llm_providers": {
-                "openai": {"status": "healthy", "response_time_ms": 800},
-                "gemini": {"status": "degraded", "response_time_ms": 1200, "error": "Rate limit exceeded"}
-            },
-            "checked_at": "2025-01-07T12:00:00Z"
-        }
+        # 並行檢查所有供應商，總耗時取決於最慢的一個
+        providers = [
+            (group, name, config)
+            for group, configs in (
+                ("ocr_providers", provider_config.ocr_providers),
+                ("llm_providers", provider_config.llm_providers)
+            )
+            for name, config in configs.items()
+            if config.get("health_url")
+        ]
+        results = await asyncio.gather(
+            *(_probe(config) for _, _, config in providers),
+            return_exceptions=True
+        )
+        
+        health_status: Dict[str, Any] = {"ocr_providers": {}, "llm_providers": {}}
+        for (group, name, _), result in zip(providers, results):
+            if isinstance(result, asyncio.TimeoutError):
+                result = {"status": "unhealthy", "error": "Health check timed out"}
+            elif isinstance(result, BaseException):
+                result = {"status": "unhealthy", "error": str(result) or type(result).__name__}
+            health_status[group][name] = result
+        health_status["checked_at"] = datetime.utcnow().isoformat()
         
         logger.info("Performed provider health check")
-        return health_status
+        return ORJSONResponse(health_status)
         
     except Exception as e:
         logger.error(f"Failed to check provider health: {e}")
@@ -125,22 +246,23 @@ async def check_provider_health():
 
 
 @router.get("/settings/system")
+@cached("system", expire=10)
 async def get_system_info():
     """取得系統資訊"""
     try:
-        import platform
-
-        import psutil
+        if psutil is None:
+            # psutil 未安裝時的回退
+            return {
+                "platform": {"system": "Unknown"},
+                "resources": {"status": "monitoring_unavailable"},
+                "api_version": "1.0.0"
+            }
         
         system_info = {
-            "platform": {
-                "system": platform.system(),
-                "release": platform.release(),
-                "machine": platform.machine(),
-                "python_version": platform.python_version()
-            },
+            "platform": _PLATFORM,
             "resources": {
-                "cpu_percent": psutil.cpu_percent(interval=1),
+                # 僅回傳背景任務的取樣值；首次取樣前為 None（在此呼叫 cpu_percent 會重設取樣基準）
+                "cpu_percent": _cpu_percent,
                 "memory_percent": psutil.virtual_memory().percent,
                 "disk_percent": psutil.disk_usage('/').percent
             },
@@ -151,13 +273,6 @@ async def get_system_info():
         
         return system_info
         
-    except ImportError:
-        # psutil 未安裝時的回退
-        return {
-            "platform": {"system": "Unknown"},
-            "resources": {"status": "monitoring_unavailable"},
-            "api_version": "1.0.0"
-        }
     except Exception as e:
         logger.error(f"Failed to get system info: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
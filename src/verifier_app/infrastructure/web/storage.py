@@ -3,75 +3,103 @@
 """
 
 import mimetypes
+import stat
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Awaitable, Callable
 
-from fastapi import APIRouter, HTTPException, Response
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse, RedirectResponse
 
+from ..adapters.storage import LocalStorageAdapter
 from ..services.storage_service import StorageService
 
 router = APIRouter(prefix="/api/v1/storage", tags=["storage"])
 
 
+@lru_cache(maxsize=1)
+def _storage() -> StorageService:
+    """取得共用的儲存服務實例"""
+    return StorageService()
+
+
+# 瀏覽器快取時間（秒）
+CACHE_MAX_AGE = 3600
+
+
+def _local_file_response(request: Request, file_path_obj: Path) -> Response:
+    """回傳本地檔案，以 ETag 處理條件式請求"""
+    try:
+        stat_result = file_path_obj.stat()
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    # 目錄等非一般檔案視為不存在
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    # 以檔案大小與修改時間產生 ETag
+    etag = f'"{stat_result.st_size:x}-{int(stat_result.st_mtime):x}"'
+    cache_headers = {"ETag": etag, "Cache-Control": f"public, max-age={CACHE_MAX_AGE}"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (
+        if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+    ):
+        return Response(status_code=304, headers=cache_headers)
+
+    # 推測 MIME 類型
+    mime_type, _ = mimetypes.guess_type(str(file_path_obj))
+    if not mime_type:
+        mime_type = "application/octet-stream"
+
+    # 傳入 stat_result 避免 FileResponse 再次 stat；自訂的 ETag 優先於其預設值
+    return FileResponse(
+        path=str(file_path_obj),
+        media_type=mime_type,
+        filename=file_path_obj.name,
+        headers=cache_headers,
+        stat_result=stat_result
+    )
+
+
+async def _serve_local(file_path: str, request: Request) -> Response:
+    """本地儲存：直接提供檔案（存在與否由 stat 判斷，不再額外檢查）"""
+    return _local_file_response(request, _storage().adapter.base_path / file_path)
+
+
+async def _serve_remote(file_path: str, request: Request) -> Response:
+    """S3 或 MinIO 儲存：重定向到預簽名 URL"""
+    storage_service = _storage()
+    
+    # 檢查檔案是否存在
+    if not await storage_service.file_exists(file_path):
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    file_url = await storage_service.get_file_url(file_path)
+    if not file_url:
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    # 如果是本地檔案 URL，直接提供檔案
+    if file_url.startswith("file://"):
+        return _local_file_response(request, Path(file_url[len("file://"):]))
+    
+    return RedirectResponse(url=file_url)
+
+
+@lru_cache(maxsize=1)
+def _file_handler() -> Callable[[str, Request], Awaitable[Response]]:
+    """依儲存適配器類型選定處理函式（適配器在程序生命週期內不變，只判斷一次）"""
+    if isinstance(_storage().adapter, LocalStorageAdapter):
+        return _serve_local
+    return _serve_remote
+
+
 @router.get("/{file_path:path}")
-async def serve_file(file_path: str):
+async def serve_file(file_path: str, request: Request):
     """提供檔案服務"""
     try:
-        storage_service = StorageService()
-        
-        # 檢查檔案是否存在
-        if not await storage_service.file_exists(file_path):
-            raise HTTPException(status_code=404, detail="File not found")
-        
-        # 根據儲存適配器類型處理檔案
-        adapter = storage_service.adapter
-        
-        if hasattr(adapter, 'base_path'):  # LocalStorageAdapter
-            # 本地儲存
-            file_path_obj = adapter.base_path / file_path
-            
-            if not file_path_obj.exists():
-                raise HTTPException(status_code=404, detail="File not found")
-            
-            # 推測 MIME 類型
-            mime_type, _ = mimetypes.guess_type(str(file_path_obj))
-            if not mime_type:
-                mime_type = "application/octet-stream"
-            
-            return FileResponse(
-                path=str(file_path_obj),
-                media_type=mime_type,
-                filename=file_path_obj.name
-            )
-        
-        else:
-            # S3 或 MinIO 儲存 - 重定向到預簽名 URL
-            file_url = await storage_service.get_file_url(file_path)
-            if not file_url:
-                raise HTTPException(status_code=404, detail="File not found")
-            
-            # 如果是本地檔案 URL，直接提供檔案
-            if file_url.startswith("file://"):
-                local_path = file_url.replace("file://", "")
-                file_path_obj = Path(local_path)
-                
-                if not file_path_obj.exists():
-                    raise HTTPException(status_code=404, detail="File not found")
-                
-                mime_type, _ = mimetypes.guess_type(str(file_path_obj))
-                if not mime_type:
-                    mime_type = "application/octet-stream"
-                
-                return FileResponse(
-                    path=str(file_path_obj),
-                    media_type=mime_type,
-                    filename=file_path_obj.name
-                )
-            
-            # 對於 S3/MinIO，重定向到預簽名 URL
-            from fastapi.responses import RedirectResponse
-            return RedirectResponse(url=file_url)
+        return await _file_handler()(file_path, request)
         
     except HTTPException:
         raise
@@ -4,28 +4,153 @@
 
 import logging
 from datetime import datetime
-from typing import List, Optional
+from functools import lru_cache
+from typing import Any, List, Optional
 from uuid import uuid4
 
 from fastapi import APIRouter, File, Form, HTTPException, Query, UploadFile
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import ValidationError
+from sqlalchemy import select, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import flag_modified
 
 from ...application.templates.dtos import (BoundingBoxDto,
                                            FieldDefinitionCreateDto,
                                            FieldDefinitionDto,
                                            TemplateCreateDto, TemplateDto,
                                            TemplateListDto, TemplateUpdateDto)
-from ...infrastructure.database.base import get_sync_session
+from ...infrastructure.database.base import get_async_session
 from ...infrastructure.database.models import Template, TemplateType
 from ...infrastructure.services.llm_service import LLMService
 from ...infrastructure.services.storage_service import StorageService
+from .response_cache import cached, response_cache
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# 列表端點需要的欄位
+_LIST_COLUMNS = (
+    Template.id,
+    Template.name,
+    Template.version,
+    Template.is_active,
+    Template.created_at,
+    Template.updated_at,
+    Template.field_definitions,
+    Template.ocr_regions
+)
+
+# 檔案服務端點的 URL 前綴
+_STORAGE_PREFIX = "/api/v1/storage/"
+_BBOX_KEYS = frozenset(("x1", "y1", "x2", "y2"))
+
+
+@lru_cache(maxsize=1)
+def _storage() -> StorageService:
+    """取得共用的儲存服務實例"""
+    return StorageService()
+
+
+@lru_cache(maxsize=1)
+def _llm() -> LLMService:
+    """取得共用的 LLM 服務實例"""
+    return LLMService()
+
+
+def _stored_fields(raw: Any) -> List[dict]:
+    """取出格式完整的欄位定義，略過舊資料中缺少 name 或 bbox 的項目"""
+    if not isinstance(raw, list):
+        return []
+    return [
+        field_def for field_def in raw
+        if isinstance(field_def, dict)
+        and "name" in field_def
+        and isinstance(field_def.get("bbox"), dict)
+        and _BBOX_KEYS <= field_def["bbox"].keys()
+    ]
+
+
+def _field_row(field_def: dict) -> dict:
+    """將資料庫中的欄位定義轉為 FieldDefinitionDto 結構的字典"""
+    bbox = field_def["bbox"]
+    return {
+        "id": field_def.get("id") or str(uuid4()),
+        "name": field_def["name"],
+        "bbox": {
+            "x1": float(bbox["x1"]),
+            "y1": float(bbox["y1"]),
+            "x2": float(bbox["x2"]),
+            "y2": float(bbox["y2"])
+        },
+        "required": field_def.get("required", False),
+        "suggested": field_def.get("suggested", False)
+    }
+
+
+def _field_dtos_from_json(raw: Optional[List[dict]]) -> List[FieldDefinitionDto]:
+    """將資料庫中的欄位定義轉為 DTO（先過濾格式不完整的項目，再以 model_construct 略過驗證）"""
+    return [
+        FieldDefinitionDto.model_construct(
+            id=field_def.get("id") or str(uuid4()),
+            name=field_def["name"],
+            bbox=BoundingBoxDto.model_construct(**field_def["bbox"]),
+            required=field_def.get("required", False),
+            suggested=field_def.get("suggested", False)
+        )
+        for field_def in _stored_fields(raw)
+    ]
+
+
+def _base_image_url(template: Any) -> Optional[str]:
+    """由範本的 ocr_regions 產生底圖 URL"""
+    if isinstance(template.ocr_regions, dict):
+        base_image_path = template.ocr_regions.get("base_image_path")
+        if base_image_path:
+            return _STORAGE_PREFIX + base_image_path
+    return None
+
+
+def _template_dto(
+    template: Template,
+    field_definitions: List[FieldDefinitionDto],
+    base_image_url: Optional[str]
+) -> TemplateDto:
+    """將範本實體轉為 TemplateDto"""
+    return TemplateDto(
+        id=str(template.id),
+        name=template.name,
+        base_image_url=base_image_url,
+        field_definitions=field_definitions,
+        version=template.version or "1.0",
+        status="active" if template.is_active else "inactive",
+        created_at=template.created_at.isoformat(),
+        updated_at=template.updated_at.isoformat() if template.updated_at else None
+    )
+
+
+def _template_row(template: Any) -> dict:
+    """
+    將範本（ORM 實體或欄位 Row）轉為 TemplateDto 結構的字典（格式不完整的舊欄位定義會被略過）
+    
+    UUID 與 datetime 保留原型別，交由 ORJSONResponse 直接序列化。
+    """
+    return {
+        "id": template.id,
+        "name": template.name,
+        "base_image_url": _base_image_url(template),
+        "field_definitions": [_field_row(field_def) for field_def in _stored_fields(template.field_definitions)],
+        "version": template.version or "1.0",
+        "status": "active" if template.is_active else "inactive",
+        "created_at": template.created_at,
+        "updated_at": template.updated_at
+    }
+
 
 @router.get("/document-templates", response_model=TemplateListDto)
+@cached("templates", expire=30)
 async def list_templates(
     limit: int = Query(25, le=100),
     starting_after: Optional[str] = None,
@@ -33,72 +158,41 @@ async def list_templates(
 ):
     """列出範本"""
     try:
-        db = get_sync_session()
-        query = db.query(Template).filter(Template.is_active == True)
-        
-        # 類型過濾
-        if template_type:
-            try:
-                template_type_enum = TemplateType[template_type.upper()]
-                query = query.filter(Template.template_type == template_type_enum)
-            except KeyError:
-                raise HTTPException(status_code=400, detail=f"Invalid template type: {template_type}")
-            except AttributeError:
-                # 如果 template_type 不是字串，跳過過濾
-                pass
-        
-        # 分頁
-        if starting_after:
-            query = query.filter(Template.id > starting_after)
-        
-        templates = query.order_by(Template.created_at.desc()).limit(limit + 1).all()
-        
-        has_more = len(templates) > limit
-        if has_more:
-            templates = templates[:-1]
-        
-        # 轉換為 DTO
-        template_dtos = []
-        for template in templates:
-            field_definitions = []
-            if template.field_definitions and isinstance(template.field_definitions, list):
-                for field_def in template.field_definitions:
-                    if isinstance(field_def, dict) and "name" in field_def and "bbox" in field_def:
-                        field_definitions.append(FieldDefinitionDto(
-                            id=field_def.get("id", str(uuid4())),
-                            name=field_def["name"],
-                            bbox=BoundingBoxDto(**field_def["bbox"]),
-                            required=field_def.get("required", False),
-                            suggested=field_def.get("suggested", False)
-                        ))
-            
-            # 生成 base_image_url
-            base_image_url = None
-            if template.ocr_regions and isinstance(template.ocr_regions, dict):
-                base_image_path = template.ocr_regions.get("base_image_path")
-                if base_image_path:
-                    base_image_url = f"/api/v1/storage/{base_image_path}"
-            
-            template_dtos.append(TemplateDto(
-                id=str(template.id),
-                name=template.name,
-                base_image_url=base_image_url,
-                field_definitions=field_definitions,
-                version=template.version or "1.0",
-                status="active" if template.is_active else "inactive",
-                created_at=template.created_at.isoformat(),
-                updated_at=template.updated_at.isoformat() if template.updated_at else None
-            ))
-        
-        db.close()
-        
-        return TemplateListDto(
-            object="list",
-            data=template_dtos,
-            has_more=has_more,
-            total_count=len(template_dtos)
-        )
-        
+        async with get_async_session() as db:
+            # 只查詢列表需要的欄位，回傳 Row 而非完整 ORM 實體
+            query = select(*_LIST_COLUMNS).where(Template.is_active == True)
+            
+            # 類型過濾
+            if template_type:
+                try:
+                    template_type_enum = TemplateType[template_type.upper()]
+                    query = query.where(Template.template_type == template_type_enum)
+                except KeyError:
+                    raise HTTPException(status_code=400, detail=f"Invalid template type: {template_type}")
+                except AttributeError:
+                    # 如果 template_type 不是字串，跳過過濾
+                    pass
+            
+            # 分頁
+            if starting_after:
+                query = query.where(Template.id > starting_after)
+            
+            templates = (await db.execute(query.order_by(Template.created_at.desc()).limit(limit + 1))).all()
+            
+            has_more = len(templates) > limit
+            if has_more:
+                templates = templates[:-1]
+            
+            # 直接組成與 TemplateDto 相同結構的字典，略過逐筆 Pydantic 驗證
+            rows = [_template_row(template) for template in templates]
+            
+            return ORJSONResponse({
+                "object": "list",
+                "data": rows,
+                "has_more": has_more,
+                "total_count": len(rows)
+            })
+            
     except Exception as e:
         logger.error(f"Failed to list templates: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -108,97 +202,67 @@ async def list_templates(
 async def create_template(template_data: TemplateCreateDto):
     """建立範本"""
     try:
-        db = get_sync_session()
-        
-        # 檢查名稱是否重複
-        existing = db.query(Template).filter(
-            Template.name == template_data.name,
-            Template.is_active == True
-        ).first()
-        
-        if existing:
-            raise HTTPException(status_code=409, detail="Template with this name already exists")
-        
-        # 建立新範本
-        template = Template(
-            id=uuid4(),
-            name=template_data.name,
-            template_type=TemplateType.CUSTOM,
-            field_definitions=[],  # 初始為空，後續透過其他端點新增
-            is_active=True
-        )
-        
-        db.add(template)
-        db.commit()
-        db.refresh(template)
-        
-        # 轉換為 DTO
-        template_dto = TemplateDto(
-            id=str(template.id),
-            name=template.name,
-            base_image_url=None,
-            field_definitions=[],
-            version=template.version or "1.0",
-            status="active",
-            created_at=template.created_at.isoformat(),
-            updated_at=template.updated_at.isoformat() if template.updated_at else None
-        )
-        
-        db.close()
-        logger.info(f"Created template: {template.id}")
-        
-        return template_dto
-        
+        async with get_async_session() as db:
+            # 檢查名稱是否重複
+            # 只查詢主鍵，不載入 JSON 欄位與 ORM 實體
+            existing = await db.execute(select(Template.id).where(
+                Template.name == template_data.name,
+                Template.is_active == True
+            ).limit(1))
+            
+            if existing.first():
+                raise HTTPException(status_code=409, detail="Template with this name already exists")
+            
+            # 建立新範本
+            template = Template(
+                id=uuid4(),
+                name=template_data.name,
+                template_type=TemplateType.CUSTOM,
+                field_definitions=[],  # 初始為空，後續透過其他端點新增
+                is_active=True
+            )
+            
+            db.add(template)
+            await db.commit()
+            response_cache.clear("templates")
+            await db.refresh(template)
+            
+            # 轉換為 DTO
+            template_dto = _template_dto(template, [], None)
+            
+            logger.info(f"Created template: {template.id}")
+            
+            return template_dto
+            
     except HTTPException:
         raise
+    except IntegrityError:
+        # 並行建立同名範本時由部分唯一索引攔截
+        raise HTTPException(status_code=409, detail="Template with this name already exists")
     except Exception as e:
         logger.error(f"Failed to create template: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.get("/document-templates/{template_id}", response_model=TemplateDto)
+@cached("templates", expire=30)
 async def get_template(template_id: str):
     """取得範本"""
     try:
-        db = get_sync_session()
-        template = db.query(Template).filter(Template.id == template_id).first()
-        
-        if not template:
-            raise HTTPException(status_code=404, detail="Template not found")
-        
-        # 轉換欄位定義
-        field_definitions = []
-        if template.field_definitions:
-            for field_def in template.field_definitions:
-                field_definitions.append(FieldDefinitionDto(
-                    id=field_def.get("id", str(uuid4())),
-                    name=field_def["name"],
-                    bbox=BoundingBoxDto(**field_def["bbox"]),
-                    required=field_def.get("required", False),
-                    suggested=field_def.get("suggested", False)
-                ))
-        
-        # 生成 base_image_url
-        base_image_url = None
-        if template.ocr_regions and isinstance(template.ocr_regions, dict):
-            base_image_path = template.ocr_regions.get("base_image_path")
-            if base_image_path:
-                base_image_url = f"/api/v1/storage/{base_image_path}"
-        
-        template_dto = TemplateDto(
-            id=str(template.id),
-            name=template.name,
-            base_image_url=base_image_url,
-            field_definitions=field_definitions,
-            version=template.version or "1.0",
-            status="active" if template.is_active else "inactive",
-            created_at=template.created_at.isoformat(),
-            updated_at=template.updated_at.isoformat() if template.updated_at else None
-        )
-        
-        db.close()
-        return template_dto
-        
+        async with get_async_session() as db:
+            template = await db.scalar(select(Template).where(Template.id == template_id))
+            
+            if not template:
+                raise HTTPException(status_code=404, detail="Template not found")
+            
+            template_dto = _template_dto(
+                template,
+                _field_dtos_from_json(template.field_definitions),
+                _base_image_url(template)
+            )
+            
+            return template_dto
+            
     except HTTPException:
         raise
     except Exception as e:
@@ -210,86 +274,64 @@ async def get_template(template_id: str):
 async def update_template(template_id: str, template_data: TemplateUpdateDto):
     """更新範本"""
     try:
-        db = get_sync_session()
-        template = db.query(Template).filter(Template.id == template_id).first()
-        
-        if not template:
-            raise HTTPException(status_code=404, detail="Template not found")
-        
-        # 更新欄位
-        if template_data.name is not None:
-            # 檢查名稱是否重複
-            existing = db.query(Template).filter(
-                Template.name == template_data.name,
-                Template.is_active == True,
-                Template.id != template_id
-            ).first()
+        async with get_async_session() as db:
+            template = await db.scalar(select(Template).where(Template.id == template_id))
             
-            if existing:
-                raise HTTPException(status_code=409, detail="Template with this name already exists")
+            if not template:
+                raise HTTPException(status_code=404, detail="Template not found")
+            
+            # 更新欄位
+            if template_data.name is not None:
+                # 檢查名稱是否重複
+                existing = await db.execute(select(Template.id).where(
+                    Template.name == template_data.name,
+                    Template.is_active == True,
+                    Template.id != template_id
+                ).limit(1))
+                
+                if existing.first():
+                    raise HTTPException(status_code=409, detail="Template with this name already exists")
+                
+                template.name = template_data.name
+            
+            # 更新欄位定義
+            if template_data.field_definitions is not None:
+                # 轉換為字典格式存儲
+                field_definitions = []
+                for field_def in template_data.field_definitions:
+                    field_definitions.append({
+                        "id": field_def.id,
+                        "name": field_def.name,
+                        "bbox": {
+                            "x1": field_def.bbox.x1,
+                            "y1": field_def.bbox.y1,
+                            "x2": field_def.bbox.x2,
+                            "y2": field_def.bbox.y2
+                        },
+                        "required": field_def.required,
+                        "suggested": field_def.suggested
+                    })
+                template.field_definitions = field_definitions
+            
+            template.updated_at = datetime.utcnow()
+            await db.commit()
+            response_cache.clear("templates")
+            await db.refresh(template)
+            
+            template_dto = _template_dto(
+                template,
+                _field_dtos_from_json(template.field_definitions),
+                _base_image_url(template)
+            )
+            
+            logger.info(f"Updated template: {template.id}")
+            
+            return template_dto
             
-            template.name = template_data.name
-        
-        # 更新欄位定義
-        if template_data.field_definitions is not None:
-            # 轉換為字典格式存儲
-            field_definitions = []
-            for field_def in template_data.field_definitions:
-                field_definitions.append({
-                    "id": field_def.id,
-                    "name": field_def.name,
-                    "bbox": {
-                        "x1": field_def.bbox.x1,
-                        "y1": field_def.bbox.y1,
-                        "x2": field_def.bbox.x2,
-                        "y2": field_def.bbox.y2
-                    },
-                    "required": field_def.required,
-                    "suggested": field_def.suggested
-                })
-            template.field_definitions = field_definitions
-        
-        template.updated_at = datetime.utcnow()
-        db.commit()
-        db.refresh(template)
-        
-        # 轉換欄位定義
-        field_definitions = []
-        if template.field_definitions:
-            for field_def in template.field_definitions:
-                field_definitions.append(FieldDefinitionDto(
-                    id=field_def.get("id", str(uuid4())),
-                    name=field_def["name"],
-                    bbox=BoundingBoxDto(**field_def["bbox"]),
-                    required=field_def.get("required", False),
-                    suggested=field_def.get("suggested", False)
-                ))
-        
-        # 生成 base_image_url
-        base_image_url = None
-        if template.ocr_regions and isinstance(template.ocr_regions, dict):
-            base_image_path = template.ocr_regions.get("base_image_path")
-            if base_image_path:
-                base_image_url = f"/api/v1/storage/{base_image_path}"
-        
-        template_dto = TemplateDto(
-            id=str(template.id),
-            name=template.name,
-            base_image_url=base_image_url,
-            field_definitions=field_definitions,
-            version=template.version or "1.0",
-            status="active" if template.is_active else "inactive",
-            created_at=template.created_at.isoformat(),
-            updated_at=template.updated_at.isoformat() if template.updated_at else None
-        )
-        
-        db.close()
-        logger.info(f"Updated template: {template.id}")
-        
-        return template_dto
-        
     except HTTPException:
         raise
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="Template with this name already exists")
     except Exception as e:
         logger.error(f"Failed to update template {template_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -298,107 +340,85 @@ async def update_template(template_id: str, template_data: TemplateUpdateDto):
 @router.delete("/document-templates/{template_id}", status_code=204)
 async def delete_template(template_id: str):
     """刪除範本（軟刪除）"""
-    db = None
     try:
-        db = get_sync_session()
-        template = db.query(Template).filter(Template.id == template_id).first()
-        
-        if not template:
-            raise HTTPException(status_code=404, detail="Template not found")
-        
-        # 檢查是否已經被刪除
-        if not template.is_active:
-            raise HTTPException(status_code=404, detail="Template already deleted")
-        
-        # 軟刪除
-        template.is_active = False
-        template.updated_at = datetime.utcnow()
-        
-        db.commit()
-        logger.info(f"Deleted template: {template.id}")
-        
+        async with get_async_session() as db:
+            template = await db.scalar(select(Template).where(Template.id == template_id))
+            
+            if not template:
+                raise HTTPException(status_code=404, detail="Template not found")
+            
+            # 檢查是否已經被刪除
+            if not template.is_active:
+                raise HTTPException(status_code=404, detail="Template already deleted")
+            
+            # 軟刪除
+            template.is_active = False
+            template.updated_at = datetime.utcnow()
+            
+            await db.commit()
+            response_cache.clear("templates")
+            logger.info(f"Deleted template: {template.id}")
+            
     except HTTPException:
-        if db:
-            db.rollback()
         raise
     except Exception as e:
-        if db:
-            db.rollback()
         logger.error(f"Failed to delete template {template_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
-    finally:
-        if db:
-            db.close()
 
 
 @router.post("/document-templates/{template_id}/image", response_model=TemplateDto)
 async def upload_template_image(template_id: str, file: UploadFile = File(...)):
     """上傳範本底圖"""
     try:
-        db = get_sync_session()
-        template = db.query(Template).filter(Template.id == template_id).first()
-        
-        if not template:
-            raise HTTPException(status_code=404, detail="Template not found")
-        
-        # 驗證檔案類型
-        allowed_types = ["image/png", "image/jpeg", "image/jpg", "application/pdf"]
-        if file.content_type not in allowed_types:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Unsupported file type. Allowed: {', '.join(allowed_types)}"
+        async with get_async_session() as db:
+            template = await db.scalar(select(Template).where(Template.id == template_id))
+            
+            if not template:
+                raise HTTPException(status_code=404, detail="Template not found")
+            
+            # 驗證檔案類型
+            allowed_types = ["image/png", "image/jpeg", "image/jpg", "application/pdf"]
+            if file.content_type not in allowed_types:
+                raise HTTPException(
+                    status_code=400, 
+                    detail=f"Unsupported file type. Allowed: {', '.join(allowed_types)}"
+                )
+            
+            # 上傳檔案
+            storage_service = _storage()
+            
+            # 生成儲存路徑
+            storage_path = storage_service.generate_storage_path(
+                file.filename or "template_image",
+                template_id,
+                prefix="templates"
             )
-        
-        # 上傳檔案
-        storage_service = StorageService()
-        file_content = await file.read()
-        
-        # 生成儲存路徑
-        storage_path = storage_service.generate_storage_path(
-            file.filename or "template_image",
-            template_id,
-            prefix="templates"
-        )
-        
-        await storage_service.upload_file_content(file_content, storage_path)
-        
-        # 更新範本記錄（暫時儲存路徑）
-        if not template.ocr_regions:
-            template.ocr_regions = {}
-        template.ocr_regions["base_image_path"] = storage_path
-        template.updated_at = datetime.utcnow()
-        
-        db.commit()
-        db.refresh(template)
-        
-        # 轉換為 DTO
-        field_definitions = []
-        if template.field_definitions:
-            for field_def in template.field_definitions:
-                field_definitions.append(FieldDefinitionDto(
-                    id=field_def.get("id", str(uuid4())),
-                    name=field_def["name"],
-                    bbox=BoundingBoxDto(**field_def["bbox"]),
-                    required=field_def.get("required", False),
-                    suggested=field_def.get("suggested", False)
-                ))
-        
-        template_dto = TemplateDto(
-            id=str(template.id),
-            name=template.name,
-            base_image_url=f"/api/v1/storage/{storage_path}",  # 返回可訪問的 URL
-            field_definitions=field_definitions,
-            version=template.version or "1.0",
-            status="active" if template.is_active else "inactive",
-            created_at=template.created_at.isoformat(),
-            updated_at=template.updated_at.isoformat() if template.updated_at else None
-        )
-        
-        db.close()
-        logger.info(f"Uploaded image for template: {template.id}")
-        
-        return template_dto
-        
+            
+            # 直接串流 UploadFile 底層的暫存檔，不將整個檔案讀入記憶體
+            await storage_service.upload_file_stream(file.file, storage_path)
+            
+            # 更新範本記錄（暫時儲存路徑）
+            if not template.ocr_regions:
+                template.ocr_regions = {}
+            template.ocr_regions["base_image_path"] = storage_path
+            flag_modified(template, "ocr_regions")
+            template.updated_at = datetime.utcnow()
+            
+            await db.commit()
+            response_cache.clear("templates")
+            await db.refresh(template)
+            
+            # 轉換為 DTO
+            template_dto = _template_dto(
+                template,
+                _field_dtos_from_json(template.field_definitions),
+                f"/api/v1/storage/{storage_path}"  # 返回可訪問的 URL
+            )
+            
+            logger.info(f"Uploaded image for template: {template.id}")
+            
+            return template_dto
+            
     except HTTPException:
         raise
     except Exception as e:
@@ -410,61 +430,72 @@ async def upload_template_image(template_id: str, file: UploadFile = File(...)):
 async def add_field_definition(template_id: str, field_data: FieldDefinitionCreateDto):
     """新增欄位定義"""
     try:
-        db = get_sync_session()
-        template = db.query(Template).filter(Template.id == template_id).first()
-        
-        if not template:
-            raise HTTPException(status_code=404, detail="Template not found")
-        
-        # 驗證座標框
-        bbox = field_data.bbox
-        if bbox.x1 >= bbox.x2 or bbox.y1 >= bbox.y2:
-            raise HTTPException(status_code=400, detail="Invalid bounding box coordinates")
-        
-        # 建立新欄位定義
-        field_id = str(uuid4())
-        new_field = {
-            "id": field_id,
-            "name": field_data.name,
-            "bbox": {
-                "x1": bbox.x1,
-                "y1": bbox.y1,
-                "x2": bbox.x2,
-                "y2": bbox.y2
-            },
-            "required": field_data.required,
-            "suggested": False
-        }
-        
-        # 更新範本的欄位定義
-        if not template.field_definitions:
-            template.field_definitions = []
-        
-        # 檢查欄位名稱是否重複
-        for existing_field in template.field_definitions:
-            if existing_field["name"] == field_data.name:
+        async with get_async_session() as db:
+            if db.bind.dialect.name == "postgresql":
+                # 以 JSONB 包含查詢（@>）在資料庫端判斷欄位名稱是否重複，與範本一併取回
+                name_taken_clause = type_coerce(Template.field_definitions, JSONB).contains(
+                    [{"name": field_data.name}]
+                )
+                row = (await db.execute(
+                    select(Template, name_taken_clause).where(Template.id == template_id)
+                )).first()
+                template, name_taken = row if row else (None, False)
+            else:
+                template = await db.scalar(select(Template).where(Template.id == template_id))
+                name_taken = template is not None and any(
+                    existing_field["name"] == field_data.name
+                    for existing_field in template.field_definitions or []
+                )
+            
+            if not template:
+                raise HTTPException(status_code=404, detail="Template not found")
+            
+            # 檢查欄位名稱是否重複
+            if name_taken:
                 raise HTTPException(status_code=409, detail="Field with this name already exists")
-        
-        template.field_definitions.append(new_field)
-        template.updated_at = datetime.utcnow()
-        
-        # 標記為已修改以觸發 JSON 欄位更新
-        db.add(template)
-        db.commit()
-        
-        field_dto = FieldDefinitionDto(
-            id=field_id,
-            name=field_data.name,
-            bbox=bbox,
-            required=field_data.required,
-            suggested=False
-        )
-        
-        db.close()
-        logger.info(f"Added field '{field_data.name}' to template: {template.id}")
-        
-        return field_dto
-        
+            
+            # 座標框已由 BoundingBoxDto 驗證
+            bbox = field_data.bbox
+            
+            # 建立新欄位定義
+            field_id = str(uuid4())
+            new_field = {
+                "id": field_id,
+                "name": field_data.name,
+                "bbox": {
+                    "x1": bbox.x1,
+                    "y1": bbox.y1,
+                    "x2": bbox.x2,
+                    "y2": bbox.y2
+                },
+                "required": field_data.required,
+                "suggested": False
+            }
+            
+            # 更新範本的欄位定義
+            if not template.field_definitions:
+                template.field_definitions = []
+            
+            template.field_definitions.append(new_field)
+            template.updated_at = datetime.utcnow()
+            
+            # 原地修改 JSON 欄位不會被追蹤，需標記為已修改以觸發更新
+            flag_modified(template, "field_definitions")
+            await db.commit()
+            response_cache.clear("templates")
+            
+            field_dto = FieldDefinitionDto(
+                id=field_id,
+                name=field_data.name,
+                bbox=bbox,
+                required=field_data.required,
+                suggested=False
+            )
+            
+            logger.info(f"Added field '{field_data.name}' to template: {template.id}")
+            
+            return field_dto
+            
     except HTTPException:
         raise
     except Exception as e:
@@ -476,50 +507,52 @@ async def add_field_definition(template_id: str, field_data: FieldDefinitionCrea
 async def suggest_fields_with_ai(template_id: str, prompt: Optional[dict] = None):
     """LLM 自動建議欄位"""
     try:
-        db = get_sync_session()
-        template = db.query(Template).filter(Template.id == template_id).first()
-        
-        if not template:
-            raise HTTPException(status_code=404, detail="Template not found")
-        
-        # 檢查是否有底圖
-        if not template.ocr_regions or not template.ocr_regions.get("base_image_path"):
-            raise HTTPException(
-                status_code=412, 
-                detail="Template must have a base image before AI field suggestion"
-            )
-        
-        # 實作 LLM 欄位建議邏輯
-        llm_service = LLMService()
-        # 這裡需要獲取 OCR 文字，目前假設 template.ocr_regions 中包含處理過的文字
-        # 實際應用中，可能需要從 storage_service 下載圖片，再調用 OCR 服務獲取文字
-        # 為了 POC，暫時使用一個佔位符
-        ocr_text = "Document text content will be here."
-        
-        # 調用 LLM 服務獲取建議欄位
-        suggested_fields_raw = await llm_service.suggest_fields(ocr_text, prompt)
-        
-        # 確保返回的是列表，如果不是則返回空列表
-        if not isinstance(suggested_fields_raw, list):
-            logger.error(f"LLMService.suggest_fields 返回的格式不正確: {suggested_fields_raw}")
-            suggested_fields_raw = []
-
-        # 轉換為 DTO
-        field_dtos = []
-        for field in suggested_fields_raw:
-            field_dtos.append(FieldDefinitionDto(
-                id=field.get("id", str(uuid4())),
-                name=field["name"],
-                bbox=BoundingBoxDto(**field["bbox"]),
-                required=field.get("required", False),
-                suggested=field.get("suggested", True)
-            ))
-        
-        db.close()
-        logger.info(f"Generated AI field suggestions for template: {template.id}")
-        
-        return field_dtos
-        
+        async with get_async_session() as db:
+            template = await db.scalar(select(Template).where(Template.id == template_id))
+            
+            if not template:
+                raise HTTPException(status_code=404, detail="Template not found")
+            
+            # 檢查是否有底圖
+            if not template.ocr_regions or not template.ocr_regions.get("base_image_path"):
+                raise HTTPException(
+                    status_code=412, 
+                    detail="Template must have a base image before AI field suggestion"
+                )
+            
+            # 實作 LLM 欄位建議邏輯
+            llm_service = _llm()
+            # 這裡需要獲取 OCR 文字，目前假設 template.ocr_regions 中包含處理過的文字
+            # 實際應用中，可能需要從 storage_service 下載圖片，再調用 OCR 服務獲取文字
+            # 為了 POC，暫時使用一個佔位符
+            ocr_text = "Document text content will be here."
+            
+            # 調用 LLM 服務獲取建議欄位
+            suggested_fields_raw = await llm_service.suggest_fields(ocr_text, prompt)
+            
+            # 確保返回的是列表，如果不是則返回空列表
+            if not isinstance(suggested_fields_raw, list):
+                logger.error(f"LLMService.suggest_fields 返回的格式不正確: {suggested_fields_raw}")
+                suggested_fields_raw = []
+
+            # 轉換為 DTO（格式不正確或座標無效的建議個別略過，不影響其他建議）
+            field_dtos = []
+            for field in suggested_fields_raw:
+                try:
+                    field_dtos.append(FieldDefinitionDto(
+                        id=field.get("id", str(uuid4())),
+                        name=field["name"],
+                        bbox=BoundingBoxDto(**field["bbox"]),
+                        required=field.get("required", False),
+                        suggested=field.get("suggested", True)
+                    ))
+                except (ValidationError, KeyError, TypeError, AttributeError) as e:
+                    logger.warning(f"Skipping invalid AI field suggestion {field}: {e}")
+            
+            logger.info(f"Generated AI field suggestions for template: {template.id}")
+            
+            return field_dtos
+            
     except HTTPException:
         raise
     except Exception as e:
@@ -2,20 +2,69 @@
 預簽上傳路由
 """
 
+import asyncio
 import hashlib
 import logging
+import secrets
 from datetime import datetime, timedelta
-from typing import List, Optional
+from functools import lru_cache
+from typing import BinaryIO, List, Optional, Tuple
 
 from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
+from ...core.config import settings
 from ...infrastructure.services.storage_service import StorageService
+from .clock import utc_now_iso
+from .response_cache import response_cache
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=1)
+def _storage() -> StorageService:
+    """取得共用的儲存服務實例"""
+    return StorageService()
+
+
+# 允許預簽上傳的檔案類型
+_ALLOWED_TYPE_LIST = (
+    "image/png", "image/jpeg", "image/jpg",
+    "application/pdf", "image/tiff", "image/tif"
+)
+ALLOWED_TYPES = frozenset(_ALLOWED_TYPE_LIST)
+_ALLOWED_TYPES_TEXT = ", ".join(_ALLOWED_TYPE_LIST)
+
+# 預簽 URL 有效時間（秒）；快取保留一半時間，確保回傳的 URL 仍有足夠效期
+PRESIGN_EXPIRES_SECONDS = 3600
+
+# 上傳檔案串流讀取的區塊大小
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _digest_file(file_obj: BinaryIO) -> Tuple[str, int]:
+    """分塊讀取檔案計算內容雜湊（BLAKE2b-128），回傳雜湊值與檔案大小"""
+    hasher = hashlib.blake2b(digest_size=16)
+    size = 0
+    while chunk := file_obj.read(HASH_CHUNK_SIZE):
+        hasher.update(chunk)
+        size += len(chunk)
+    return hasher.hexdigest(), size
+
+
+async def _digest_upload(file: UploadFile) -> Tuple[str, int]:
+    """
+    在執行緒池中計算上傳檔案的內容雜湊
+    
+    hashlib 更新大區塊時會釋放 GIL，多個檔案同時計算可分散到多個 CPU 核心。
+    """
+    await file.seek(0)
+    return await run_in_threadpool(_digest_file, file.file)
+
+
 class PresignRequest(BaseModel):
     mime_type: str
     size: int
@@ -42,15 +91,10 @@ async def presign_upload(request: PresignRequest):
     """產生預簽上傳 URL"""
     try:
         # 驗證檔案類型
-        allowed_types = [
-            "image/png", "image/jpeg", "image/jpg", 
-            "application/pdf", "image/tiff", "image/tif"
-        ]
-        
-        if request.mime_type not in allowed_types:
+        if request.mime_type not in ALLOWED_TYPES:
             raise HTTPException(
                 status_code=400, 
-                detail=f"Unsupported file type: {request.mime_type}. Allowed: {', '.join(allowed_types)}"
+                detail=f"Unsupported file type: {request.mime_type}. Allowed: {_ALLOWED_TYPES_TEXT}"
             )
         
         # 驗證檔案大小 (50MB)
@@ -61,27 +105,35 @@ async def presign_upload(request: PresignRequest):
                 detail=f"File size {request.size} exceeds maximum allowed size {max_size}"
             )
         
+        # 相同內容（以 checksum 識別）的重複請求沿用尚未過半效期的預簽結果，
+        # 讓同一物件得到相同 URL；未提供 checksum 時無法判斷是否為同一檔案，不快取
+        cache_key = (request.mime_type, request.size, request.checksum) if request.checksum else None
+        if cache_key is not None:
+            cached_response = response_cache.get("presign", cache_key, None)
+            if cached_response is not None:
+                return cached_response
+        
         # 生成物件鍵
         timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
         file_extension = request.mime_type.split('/')[-1]
         if file_extension == "jpeg":
             file_extension = "jpg"
         
-        object_key = f"uploads/{timestamp}_{hashlib.md5(str(request.size).encode()).hexdigest()[:8]}.{file_extension}"
+        object_key = f"uploads/{timestamp}_{secrets.token_hex(4)}.{file_extension}"
         
         # 生成預簽 URL
-        storage_service = StorageService()
+        storage_service = _storage()
         
         # TODO: 實作實際的預簽上傳邏輯
         # presigned_data = storage_service.generate_presigned_upload(
         #     object_key=object_key,
         #     mime_type=request.mime_type,
         #     size=request.size,
-        #     expires_in=3600  # 1 hour
+        #     expires_in=PRESIGN_EXPIRES_SECONDS
         # )
         
         # 模擬預簽回應
-        expires_at = datetime.utcnow() + timedelta(hours=1)
+        expires_at = datetime.utcnow() + timedelta(seconds=PRESIGN_EXPIRES_SECONDS)
         presigned_data = {
             "url": f"https://storage.example.com/{object_key}",
             "fields": {
@@ -101,6 +153,9 @@ async def presign_upload(request: PresignRequest):
             object_key=object_key
         )
         
+        if cache_key is not None:
+            response_cache.set("presign", cache_key, response, expire=PRESIGN_EXPIRES_SECONDS / 2)
+        
         logger.info(f"Generated presigned upload URL for {object_key}")
         return response
         
@@ -124,7 +179,7 @@ async def complete_upload(object_key: str, etag: str):
         return {
             "object_key": object_key,
             "status": "completed",
-            "completed_at": datetime.utcnow().isoformat()
+            "completed_at": utc_now_iso()
         }
         
     except Exception as e:
@@ -145,7 +200,7 @@ async def cancel_upload(object_key: str):
         return {
             "object_key": object_key,
             "status": "cancelled",
-            "cancelled_at": datetime.utcnow().isoformat()
+            "cancelled_at": utc_now_iso()
         }
         
     except Exception as e:
@@ -153,57 +208,52 @@ async def cancel_upload(object_key: str):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+async def _accept_upload(file: UploadFile) -> UploadResponse:
+    """處理單一上傳檔案（單檔與多檔上傳共用），失敗時拋出例外由呼叫端處理"""
+    # 實際文件處理邏輯
+    digest, size = await _digest_upload(file)
+    document_id = f"doc_{digest}"  # 以內容雜湊生成 document_id
+
+    logger.info("Uploaded file: %s, size: %d bytes", file.filename, size)
+
+    return UploadResponse(
+        filename=file.filename,
+        content_type=file.content_type,
+        size=size,
+        document_id=document_id,
+        message="文件上傳成功！"
+    )
+
+
 @router.post("/upload/document", response_model=UploadResponse)
 async def upload_document(file: UploadFile = File(...)):
     """上傳單個文件"""
     try:
-        # 實際文件處理邏輯
-        content = await file.read()
-        document_id = f"doc_{hash(content).__abs__()}"  # 模擬生成 document_id
-
-        logger.info(f"Uploaded file: {file.filename}, size: {len(content)} bytes")
-
-        return UploadResponse(
-            filename=file.filename,
-            content_type=file.content_type,
-            size=len(content),
-            document_id=document_id,
-            message="文件上傳成功！"
-        )
+        return await _accept_upload(file)
     except Exception as e:
         logger.error(f"文件上傳失敗: {e}")
         raise HTTPException(status_code=500, detail="文件上傳失敗")
 
 
-@router.post("/upload/documents", response_model=List[UploadResponse])
-async def upload_multiple_documents(files: List[UploadFile] = File(...)):
-    """上傳多個文件"""
-    responses = []
-    for file in files:
+async def _process_one(file: UploadFile, semaphore: asyncio.Semaphore) -> UploadResponse:
+    """處理單一上傳檔案，失敗時回傳帶有錯誤訊息的回應"""
+    async with semaphore:
         try:
-            content = await file.read()
-            document_id = f"doc_{hash(content).__abs__()}"  # 模擬生成 document_id
-
-            logger.info(f"Uploaded file: {file.filename}, size: {len(content)} bytes")
-
-            responses.append(
-                UploadResponse(
-                    filename=file.filename,
-                    content_type=file.content_type,
-                    size=len(content),
-                    document_id=document_id,
-                    message="文件上傳成功！"
-                )
-            )
+            return await _accept_upload(file)
         except Exception as e:
             logger.error(f"單個文件 {file.filename} 上傳失敗: {e}")
-            responses.append(
-                UploadResponse(
-                    filename=file.filename,
-                    content_type=file.content_type if file.content_type else "application/octet-stream",
-                    size=0,
-                    document_id="",
-                    message=f"文件上傳失敗: {e}"
-                )
+            return UploadResponse(
+                filename=file.filename,
+                content_type=file.content_type if file.content_type else "application/octet-stream",
+                size=0,
+                document_id="",
+                message=f"文件上傳失敗: {e}"
             )
-    return responses
+
+
+@router.post("/upload/documents", response_model=List[UploadResponse])
+async def upload_multiple_documents(files: List[UploadFile] = File(...)):
+    """上傳多個文件"""
+    # 並行處理各檔案並限制同時處理數量；gather 保持輸入順序
+    semaphore = asyncio.Semaphore(settings.UPLOAD_CONCURRENCY)
+    return await asyncio.gather(*(_process_one(file, semaphore) for file in files))
@@ -3,20 +3,37 @@
 """
 
 import logging
+import re
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 from uuid import uuid4
 
 from fastapi import APIRouter, Form, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 
-from ...infrastructure.database.base import get_sync_session
+from ...infrastructure.database.base import get_async_session
 from ...infrastructure.database.models import Template
+from .response_cache import response_cache
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 logger = logging.getLogger(__name__)
 
+# 語義版號（範本預設版本為 "1.0"，修訂號可省略）
+_SEMVER_RE = re.compile(r"^(\d+)\.(\d+)(?:\.(\d+))?$")
+
+
+@lru_cache(maxsize=1024)
+def _parse_semver(version: str) -> Tuple[int, int, int]:
+    """解析版本字串為 (major, minor, patch)，格式錯誤時拋出 ValueError"""
+    match = _SEMVER_RE.match(version)
+    if match is None:
+        raise ValueError(f"Invalid version: {version}")
+    return int(match[1]), int(match[2]), int(match[3] or 0)
+
 
 class VersionCreateRequest(BaseModel):
     changes: str
@@ -40,54 +57,62 @@ class PublishRequest(BaseModel):
 async def create_version(template_id: str, request: VersionCreateRequest):
     """產生新版本（語義版號）"""
     try:
-        db = get_sync_session()
-        template = db.query(Template).filter(Template.id == template_id).first()
-        
-        if not template:
-            raise HTTPException(status_code=404, detail="Template not found")
-        
-        # 計算新版本號
-        current_version = template.version or "1.0.0"
-        version_parts = current_version.split(".")
-        major, minor, patch = int(version_parts[0]), int(version_parts[1]), int(version_parts[2]) if len(version_parts) > 2 else 0
-        
-        if request.version_type == "major":
-            new_version = f"{major + 1}.0.0"
-        elif request.version_type == "minor":
-            new_version = f"{major}.{minor + 1}.0"
-        else:  # patch
-            new_version = f"{major}.{minor}.{patch + 1}"
-        
-        # 更新範本版本
-        template.version = new_version
-        template.updated_at = datetime.utcnow()
-        
-        # TODO: 實作版本歷史記錄
-        # version_record = TemplateVersion(
-        #     template_id=template_id,
-        #     version=new_version,
-        #     changes=request.changes,
-        #     status="draft"
-        # )
-        # db.add(version_record)
-        
-        db.commit()
-        db.refresh(template)
-        
-        response = VersionResponse(
-            template_id=str(template.id),
-            version=new_version,
-            status="draft",
-            rollout_percent=0,
-            created_at=template.updated_at.isoformat(),
-            changes=request.changes
-        )
-        
-        db.close()
-        logger.info(f"Created version {new_version} for template: {template.id}")
-        
-        return response
-        
+        async with get_async_session() as db:
+            # 只鎖定並讀取目前版本號，不載入整個範本
+            row = (await db.execute(
+                select(Template.version).where(Template.id == template_id).with_for_update()
+            )).first()
+            
+            if not row:
+                raise HTTPException(status_code=404, detail="Template not found")
+            
+            # 計算新版本號
+            current_version = row.version or "1.0.0"
+            try:
+                major, minor, patch = _parse_semver(current_version)
+            except ValueError:
+                raise HTTPException(status_code=422, detail=f"Template has invalid version: {current_version}")
+            
+            if request.version_type == "major":
+                new_version = f"{major + 1}.0.0"
+            elif request.version_type == "minor":
+                new_version = f"{major}.{minor + 1}.0"
+            else:  # patch
+                new_version = f"{major}.{minor}.{patch + 1}"
+            
+            # 更新範本版本（UPDATE ... RETURNING，不需再 refresh）
+            updated_at = (await db.execute(
+                update(Template)
+                .where(Template.id == template_id)
+                .values(version=new_version, updated_at=datetime.utcnow())
+                .returning(Template.updated_at)
+            )).scalar_one()
+            
+            # TODO: 實作版本歷史記錄
+            # version_record = TemplateVersion(
+            #     template_id=template_id,
+            #     version=new_version,
+            #     changes=request.changes,
+            #     status="draft"
+            # )
+            # db.add(version_record)
+            
+            await db.commit()
+            response_cache.clear("templates")
+            
+            response = VersionResponse(
+                template_id=template_id,
+                version=new_version,
+                status="draft",
+                rollout_percent=0,
+                created_at=updated_at.isoformat(),
+                changes=request.changes
+            )
+            
+            logger.info(f"Created version {new_version} for template: {template_id}")
+            
+            return response
+            
     except HTTPException:
         raise
     except Exception as e:
@@ -99,35 +124,39 @@ async def create_version(template_id: str, request: VersionCreateRequest):
 async def publish_version(template_id: str, version: str, request: PublishRequest):
     """發佈版本（含灰度參數）"""
     try:
-        db = get_sync_session()
-        template = db.query(Template).filter(Template.id == template_id).first()
-        
-        if not template:
-            raise HTTPException(status_code=404, detail="Template not found")
-        
-        if template.version != version:
-            raise HTTPException(status_code=404, detail="Version not found")
-        
-        # TODO: 實作版本發佈邏輯
-        # - 檢查版本狀態
-        # - 設定灰度比例
-        # - 更新版本狀態
-        
-        # 模擬發佈
-        template.updated_at = datetime.utcnow()
-        db.commit()
-        
-        db.close()
-        logger.info(f"Published version {version} for template {template_id} with rollout {request.rollout_percent}%")
-        
-        return {
-            "template_id": template_id,
-            "version": version,
-            "status": "published",
-            "rollout_percent": request.rollout_percent,
-            "published_at": datetime.utcnow().isoformat()
-        }
-        
+        async with get_async_session() as db:
+            
+            # TODO: 實作版本發佈邏輯
+            # - 檢查版本狀態
+            # - 設定灰度比例
+            # - 更新版本狀態
+            
+            # 模擬發佈：版本相符時直接更新，一次往返完成
+            published = (await db.execute(
+                update(Template)
+                .where(Template.id == template_id, Template.version == version)
+                .values(updated_at=datetime.utcnow())
+                .returning(Template.id)
+            )).first()
+            
+            if not published:
+                # 區分範本不存在或版本不符
+                exists = (await db.execute(select(Template.id).where(Template.id == template_id))).first()
+                raise HTTPException(status_code=404, detail="Version not found" if exists else "Template not found")
+            
+            await db.commit()
+            response_cache.clear("templates")
+            
+            logger.info(f"Published version {version} for template {template_id} with rollout {request.rollout_percent}%")
+            
+            return {
+                "template_id": template_id,
+                "version": version,
+                "status": "published",
+                "rollout_percent": request.rollout_percent,
+                "published_at": datetime.utcnow().isoformat()
+            }
+            
     except HTTPException:
         raise
     except Exception as e:
@@ -139,32 +168,36 @@ async def publish_version(template_id: str, version: str, request: PublishReques
 async def rollback_version(template_id: str, version: str):
     """回滾到指定版本"""
     try:
-        db = get_sync_session()
-        template = db.query(Template).filter(Template.id == template_id).first()
-        
-        if not template:
-            raise HTTPException(status_code=404, detail="Template not found")
-        
-        # TODO: 實作版本回滾邏輯
-        # - 驗證目標版本存在且穩定
-        # - 回滾範本配置
-        # - 記錄回滾操作
-        
-        # 模擬回滾
-        template.version = version
-        template.updated_at = datetime.utcnow()
-        db.commit()
-        
-        db.close()
-        logger.info(f"Rolled back template {template_id} to version {version}")
-        
-        return {
-            "template_id": template_id,
-            "version": version,
-            "status": "rolled_back",
-            "rolled_back_at": datetime.utcnow().isoformat()
-        }
-        
+        async with get_async_session() as db:
+            
+            # TODO: 實作版本回滾邏輯
+            # - 驗證目標版本存在且穩定
+            # - 回滾範本配置
+            # - 記錄回滾操作
+            
+            # 模擬回滾
+            rolled_back = (await db.execute(
+                update(Template)
+                .where(Template.id == template_id)
+                .values(version=version, updated_at=datetime.utcnow())
+                .returning(Template.id)
+            )).first()
+            
+            if not rolled_back:
+                raise HTTPException(status_code=404, detail="Template not found")
+            
+            await db.commit()
+            response_cache.clear("templates")
+            
+            logger.info(f"Rolled back template {template_id} to version {version}")
+            
+            return {
+                "template_id": template_id,
+                "version": version,
+                "status": "rolled_back",
+                "rolled_back_at": datetime.utcnow().isoformat()
+            }
+            
     except HTTPException:
         raise
     except Exception as e:
@@ -176,33 +209,31 @@ async def rollback_version(template_id: str, version: str):
 async def list_versions(template_id: str):
     """列出範本的所有版本"""
     try:
-        db = get_sync_session()
-        template = db.query(Template).filter(Template.id == template_id).first()
-        
-        if not template:
-            raise HTTPException(status_code=404, detail="Template not found")
-        
-        # TODO: 實作版本列表查詢
-        # versions = db.query(TemplateVersion).filter(TemplateVersion.template_id == template_id).all()
-        
-        # 模擬版本列表
-        versions = [
-            {
-                "version": template.version or "1.0.0",
-                "status": "published",
-                "rollout_percent": 100,
-                "created_at": template.created_at.isoformat(),
-                "changes": "Current version"
+        async with get_async_session() as db:
+            template = await db.scalar(select(Template).where(Template.id == template_id))
+            
+            if not template:
+                raise HTTPException(status_code=404, detail="Template not found")
+            
+            # TODO: 實作版本列表查詢
+            # versions = db.query(TemplateVersion).filter(TemplateVersion.template_id == template_id).all()
+            
+            # 模擬版本列表
+            versions = [
+                {
+                    "version": template.version or "1.0.0",
+                    "status": "published",
+                    "rollout_percent": 100,
+                    "created_at": template.created_at.isoformat(),
+                    "changes": "Current version"
+                }
+            ]
+            
+            return {
+                "template_id": template_id,
+                "versions": versions
             }
-        ]
-        
-        db.close()
-        
-        return {
-            "template_id": template_id,
-            "versions": versions
-        }
-        
+            
     except HTTPException:
         raise
     except Exception as e:
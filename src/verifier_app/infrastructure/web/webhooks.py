@@ -4,16 +4,21 @@ Webhook 管理路由
 
 import hashlib
 import hmac
-import json
 import logging
-from datetime import datetime, timedelta
-from typing import List, Optional
-from uuid import uuid4
+import os
+from collections import defaultdict, deque
+from itertools import islice
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple, Union
+from uuid import UUID
 
+import orjson
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field, HttpUrl
 
-router = APIRouter()
+from .clock import utc_now_iso
+
+router = APIRouter(default_response_class=ORJSONResponse)
 logger = logging.getLogger(__name__)
 
 
@@ -61,31 +66,105 @@ class WebhookDelivery(BaseModel):
     next_retry_at: Optional[str]
 
 
+# 可訂閱的事件類型
+_VALID_EVENT_LIST = (
+    "document.queued", "document.processing", "document.passed",
+    "document.failed", "document.review_required", "review.decided",
+    "template.created", "template.updated", "template.deleted"
+)
+VALID_EVENTS = frozenset(_VALID_EVENT_LIST)
+_VALID_EVENTS_TEXT = ", ".join(_VALID_EVENT_LIST)
+
 # 模擬儲存
 webhooks_db = {}
 deliveries_db = {}
 
+# 各 webhook 的投遞記錄 ID，依建立順序附加（由舊到新）
+deliveries_by_webhook: Dict[str, List[str]] = defaultdict(list)
+
+# 事件類型 -> 訂閱的 webhook ID，以及啟用中的 webhook ID
+_event_index: Dict[str, Set[str]] = defaultdict(set)
+_active_webhooks: Set[str] = set()
+
+
+# 回應內容快取：webhook ID -> (版本號, Webhook 結構的字典)，webhook 內容變更時遞增版本號
+_webhook_rows: Dict[str, Tuple[int, dict]] = {}
+
+# 簽名用 HMAC 快取：webhook ID -> (版本號, 已完成金鑰排程的 HMAC 物件)
+# 以 webhook 而非密鑰為鍵，密鑰更新、輪替或 webhook 刪除時即移除，不在記憶體中保留舊密鑰
+_hmac_templates: Dict[str, Tuple[int, "hmac.HMAC"]] = {}
+
+
+def _touch_webhook(webhook: dict) -> None:
+    """webhook 內容變更後更新密鑰預覽並遞增版本號，使快取的回應模型失效"""
+    secret = webhook["secret"]
+    webhook["secret_preview"] = secret[:8] + "..." if len(secret) > 8 else secret
+    webhook["_rev"] = webhook.get("_rev", 0) + 1
+    _hmac_templates.pop(webhook["id"], None)
+
+
+def _webhook_row(webhook: dict) -> dict:
+    """取得 webhook 的回應內容（回應時隱藏完整密鑰），內容未變更時重用快取"""
+    cached = _webhook_rows.get(webhook["id"])
+    if cached is not None and cached[0] == webhook["_rev"]:
+        return cached[1]
+    row = Webhook(**webhook).model_dump()
+    _webhook_rows[webhook["id"]] = (webhook["_rev"], row)
+    return row
+
+
+# 投遞記錄對外欄位（排除內部使用的 payload 與簽名）
+_DELIVERY_FIELDS = tuple(WebhookDelivery.model_fields)
+
+
+def _index_webhook(webhook: dict) -> None:
+    """將 webhook 加入事件與啟用狀態索引"""
+    for event in webhook["events"]:
+        _event_index[event].add(webhook["id"])
+    if webhook["active"]:
+        _active_webhooks.add(webhook["id"])
+
+
+def _unindex_webhook(webhook: dict) -> None:
+    """自事件與啟用狀態索引移除 webhook"""
+    for event in webhook["events"]:
+        subscribers = _event_index.get(event)
+        if subscribers is not None:
+            subscribers.discard(webhook["id"])
+            if not subscribers:
+                del _event_index[event]
+    _active_webhooks.discard(webhook["id"])
+
+# 預先產生的 UUID 池：一次系統呼叫取得整批隨機位元組，避免每個 ID 各讀一次 urandom
+UUID_POOL_SIZE = 4096
+_uuid_pool: Deque[str] = deque()
+
+
+def _new_id() -> str:
+    """從 UUID 池取出一個 UUID4 字串，池空時整批補充"""
+    if not _uuid_pool:
+        random_bytes = os.urandom(16 * UUID_POOL_SIZE)
+        _uuid_pool.extend(
+            str(UUID(bytes=random_bytes[i:i + 16], version=4))
+            for i in range(0, len(random_bytes), 16)
+        )
+    return _uuid_pool.popleft()
+
 
 @router.post("/webhooks", response_model=Webhook, status_code=201)
 async def create_webhook(webhook_data: WebhookCreate):
     """建立 Webhook"""
     try:
         # 驗證事件類型
-        valid_events = [
-            "document.queued", "document.processing", "document.passed", 
-            "document.failed", "document.review_required", "review.decided",
-            "template.created", "template.updated", "template.deleted"
-        ]
-        
         for event in webhook_data.events:
-            if event not in valid_events:
+            if event not in VALID_EVENTS:
                 raise HTTPException(
                     status_code=400, 
-                    detail=f"Invalid event type: {event}. Valid events: {', '.join(valid_events)}"
+                    detail=f"Invalid event type: {event}. Valid events: {_VALID_EVENTS_TEXT}"
                 )
         
         # 生成 Webhook
-        webhook_id = str(uuid4())
+        webhook_id = _new_id()
         secret = webhook_data.secret or generate_webhook_secret()
         
         webhook = {
@@ -95,20 +174,18 @@ async def create_webhook(webhook_data: WebhookCreate):
             "secret": secret,
             "description": webhook_data.description,
             "active": webhook_data.active,
-            "created_at": datetime.utcnow().isoformat(),
+            "created_at": utc_now_iso(),
             "updated_at": None,
             "last_delivery_at": None,
             "delivery_count": 0,
             "failure_count": 0
         }
         
+        _touch_webhook(webhook)
         webhooks_db[webhook_id] = webhook
+        _index_webhook(webhook)
         
-        # 回應時隱藏完整密鑰
-        response_webhook = Webhook(
-            **webhook,
-            secret_preview=secret[:8] + "..." if len(secret) > 8 else secret
-        )
+        response_webhook = _webhook_row(webhook)
         
         logger.info(f"Created webhook {webhook_id} for {webhook_data.url}")
         return response_webhook
@@ -128,26 +205,16 @@ async def list_webhooks(
 ):
     """列出 Webhooks"""
     try:
-        webhooks = list(webhooks_db.values())
+        webhooks = webhooks_db.values()
         
         if active_only:
-            webhooks = [w for w in webhooks if w["active"]]
+            webhooks = (w for w in webhooks if w["id"] in _active_webhooks)
         
-        # 分頁
-        total = len(webhooks)
-        webhooks = webhooks[offset:offset + limit]
+        # 分頁（只走訪到需要的位置，不複製整個清單）
+        webhooks = islice(webhooks, offset, offset + limit)
         
         # 隱藏密鑰
-        response_webhooks = []
-        for webhook in webhooks:
-            secret = webhook["secret"]
-            response_webhook = Webhook(
-                **webhook,
-                secret_preview=secret[:8] + "..." if len(secret) > 8 else secret
-            )
-            response_webhooks.append(response_webhook)
-        
-        return response_webhooks
+        return ORJSONResponse([_webhook_row(webhook) for webhook in webhooks])
         
     except Exception as e:
         logger.error(f"Failed to list webhooks: {e}")
@@ -162,13 +229,7 @@ async def get_webhook(webhook_id: str):
         if not webhook:
             raise HTTPException(status_code=404, detail="Webhook not found")
         
-        secret = webhook["secret"]
-        response_webhook = Webhook(
-            **webhook,
-            secret_preview=secret[:8] + "..." if len(secret) > 8 else secret
-        )
-        
-        return response_webhook
+        return _webhook_row(webhook)
         
     except HTTPException:
         raise
@@ -185,7 +246,8 @@ async def update_webhook(webhook_id: str, webhook_data: WebhookUpdate):
         if not webhook:
             raise HTTPException(status_code=404, detail="Webhook not found")
         
-        # 更新欄位
+        # 更新欄位（事件或啟用狀態可能改變，先移出索引再重新加入）
+        _unindex_webhook(webhook)
         if webhook_data.url is not None:
             webhook["url"] = str(webhook_data.url)
         if webhook_data.events is not None:
@@ -196,14 +258,12 @@ async def update_webhook(webhook_id: str, webhook_data: WebhookUpdate):
             webhook["description"] = webhook_data.description
         if webhook_data.active is not None:
             webhook["active"] = webhook_data.active
+        _index_webhook(webhook)
         
-        webhook["updated_at"] = datetime.utcnow().isoformat()
+        webhook["updated_at"] = utc_now_iso()
+        _touch_webhook(webhook)
         
-        secret = webhook["secret"]
-        response_webhook = Webhook(
-            **webhook,
-            secret_preview=secret[:8] + "..." if len(secret) > 8 else secret
-        )
+        response_webhook = _webhook_row(webhook)
         
         logger.info(f"Updated webhook {webhook_id}")
         return response_webhook
@@ -222,7 +282,10 @@ async def delete_webhook(webhook_id: str):
         if webhook_id not in webhooks_db:
             raise HTTPException(status_code=404, detail="Webhook not found")
         
-        del webhooks_db[webhook_id]
+        _unindex_webhook(webhooks_db.pop(webhook_id))
+        _webhook_rows.pop(webhook_id, None)
+        _hmac_templates.pop(webhook_id, None)
+        deliveries_by_webhook.pop(webhook_id, None)
         
         logger.info(f"Deleted webhook {webhook_id}")
         
@@ -247,9 +310,9 @@ async def test_webhook(webhook_id: str):
         
         # 模擬測試結果
         test_event = {
-            "id": str(uuid4()),
+            "id": _new_id(),
             "type": "webhook.test",
-            "created_at": datetime.utcnow().isoformat(),
+            "created_at": utc_now_iso(),
             "data": {"message": "This is a test webhook"}
         }
         
@@ -282,19 +345,16 @@ async def get_webhook_deliveries(
         if not webhook:
             raise HTTPException(status_code=404, detail="Webhook not found")
         
-        # 過濾該 webhook 的投遞記錄
-        deliveries = [d for d in deliveries_db.values() if d["webhook_id"] == webhook_id]
+        # 由索引反向走訪即為最新的在前，不需掃描全部投遞記錄或排序
+        deliveries = (deliveries_db[d_id] for d_id in reversed(deliveries_by_webhook.get(webhook_id, [])))
         
         if status:
-            deliveries = [d for d in deliveries if d["status"] == status]
-        
-        # 按時間排序（最新的在前）
-        deliveries.sort(key=lambda x: x["created_at"], reverse=True)
+            deliveries = (d for d in deliveries if d["status"] == status)
         
         # 分頁
-        deliveries = deliveries[offset:offset + limit]
+        deliveries = islice(deliveries, offset, offset + limit)
         
-        return [WebhookDelivery(**d) for d in deliveries]
+        return ORJSONResponse([{field: d[field] for field in _DELIVERY_FIELDS} for d in deliveries])
         
     except HTTPException:
         raise
@@ -316,7 +376,8 @@ async def rotate_webhook_secret(webhook_id: str):
         old_secret_preview = webhook["secret"][:8] + "..."
         
         webhook["secret"] = new_secret
-        webhook["updated_at"] = datetime.utcnow().isoformat()
+        webhook["updated_at"] = utc_now_iso()
+        _touch_webhook(webhook)
         
         logger.info(f"Rotated secret for webhook {webhook_id}")
         
@@ -340,13 +401,40 @@ def generate_webhook_secret() -> str:
     return secrets.token_urlsafe(32)
 
 
-def generate_webhook_signature(payload: str, secret: str) -> str:
-    """生成 Webhook 簽名"""
-    return hmac.new(
-        secret.encode('utf-8'),
-        payload.encode('utf-8'),
-        hashlib.sha256
-    ).hexdigest()
+def _hmac_template(webhook: dict) -> "hmac.HMAC":
+    """
+    取得 webhook 已完成金鑰排程的 HMAC 物件（依 webhook ID 與版本號快取）
+    
+    每次簽名只需 copy() 後更新內容，省去內外層金鑰推導。
+    """
+    cached = _hmac_templates.get(webhook["id"])
+    if cached is not None and cached[0] == webhook["_rev"]:
+        return cached[1]
+    template = hmac.new(webhook["secret"].encode('utf-8'), b"", hashlib.sha256)
+    _hmac_templates[webhook["id"]] = (webhook["_rev"], template)
+    return template
+
+
+def _sig_bytes(payload: Union[str, bytes], secret: str) -> bytes:
+    """計算 HMAC-SHA256 簽名的原始位元組"""
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    return hmac.new(secret.encode('utf-8'), payload, hashlib.sha256).digest()
+
+
+def generate_webhook_signature(payload: Union[str, bytes], secret: str) -> str:
+    """生成 Webhook 簽名（十六進位字串，僅在 HTTP 邊界使用）"""
+    return _sig_bytes(payload, secret).hex()
+
+
+def sign_webhook_fanout(payload: bytes, webhooks: Iterable[dict]) -> Dict[str, str]:
+    """同一事件分發給多個 webhook 時，對同一份 payload 位元組簽名，回傳 webhook ID -> 簽名"""
+    signatures = {}
+    for webhook in webhooks:
+        signer = _hmac_template(webhook).copy()
+        signer.update(payload)
+        signatures[webhook["id"]] = signer.hexdigest()
+    return signatures
 
 
 async def dispatch_webhook_event(event_type: str, data: dict):
@@ -354,23 +442,28 @@ async def dispatch_webhook_event(event_type: str, data: dict):
     try:
         # 找到訂閱此事件的 webhooks
         relevant_webhooks = [
-            w for w in webhooks_db.values() 
-            if w["active"] and event_type in w["events"]
+            webhooks_db[webhook_id]
+            for webhook_id in _event_index.get(event_type, set()) & _active_webhooks
         ]
         
         if not relevant_webhooks:
             return
         
+        created_at = utc_now_iso()
         event = {
-            "id": str(uuid4()),
+            "id": _new_id(),
             "type": event_type,
-            "created_at": datetime.utcnow().isoformat(),
+            "created_at": created_at,
             "data": data
         }
         
+        # 事件內容只序列化一次，並一次算出所有訂閱者的簽名
+        payload = orjson.dumps(event)
+        signatures = sign_webhook_fanout(payload, relevant_webhooks)
+        
         # 為每個 webhook 建立投遞記錄
         for webhook in relevant_webhooks:
-            delivery_id = str(uuid4())
+            delivery_id = _new_id()
             delivery = {
                 "id": delivery_id,
                 "webhook_id": webhook["id"],
@@ -380,17 +473,20 @@ async def dispatch_webhook_event(event_type: str, data: dict):
                 "response_body": None,
                 "error_message": None,
                 "attempt_count": 0,
-                "created_at": datetime.utcnow().isoformat(),
+                "created_at": created_at,
                 "delivered_at": None,
-                "next_retry_at": None
+                "next_retry_at": None,
+                "payload": payload,
+                "signature": signatures[webhook["id"]]
             }
             
             deliveries_db[delivery_id] = delivery
+            deliveries_by_webhook[webhook["id"]].append(delivery_id)
             
             # TODO: 實作實際的 HTTP 投遞邏輯
             # webhook_dispatcher.deliver_async(webhook, event, delivery_id)
         
-        logger.info(f"Dispatched webhook event {event_type} to {len(relevant_webhooks)} webhooks")
+        logger.info("Dispatched webhook event %s to %d webhooks", event_type, len(relevant_webhooks))
         
     except Exception as e:
         logger.error(f"Failed to dispatch webhook event {event_type}: {e}")
@@ -2,70 +2,347 @@
 WebSocket 連接管理
 """
 
-import json
+import asyncio
 import logging
-from datetime import datetime
-from typing import Dict, Set
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 
+import orjson
+import redis.asyncio as aioredis
 from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
 
+from ...core.config import settings
+from .response_cache import response_cache
+
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# 大量訂閱者時分批發送，批次之間讓出事件迴圈，避免阻塞其他請求
+BROADCAST_BATCH_SIZE = 50
+
+# 預先組好的 pong 訊息前後綴，回應心跳時只需填入時間戳記
+PONG_PREFIX = '{"type":"pong","timestamp":'
+PONG_SUFFIX = "}"
+
+# 全域連接的歡迎訊息前後綴
+GLOBAL_WELCOME_PREFIX = '{"type":"global_connection_established","timestamp":'
+GLOBAL_WELCOME_SUFFIX = ',"message":"Subscribed to global system events"}'
+
+# 每個連接的待發送佇列上限；客戶端消化過慢導致佇列滿時即關閉其連接
+SEND_QUEUE_SIZE = 256
+# 關閉緩慢或發送失敗連接時使用的關閉碼（1013：Try Again Later）
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+# Redis pub/sub 頻道：文件推播使用 ws:doc:<document_id>，系統事件使用 ws:global
+DOCUMENT_CHANNEL_PREFIX = "ws:doc:"
+GLOBAL_CHANNEL = "ws:global"
+# 回應快取清除通知（內容為命名空間，"*" 表示全部）
+CACHE_INVALIDATION_CHANNEL = "cache:invalidate"
+
+
+def _dumps(message: Dict[str, Any]) -> str:
+    """
+    以 orjson 序列化 WebSocket 訊息
+    
+    datetime 直接交由 orjson 轉為 ISO 8601（與 isoformat() 相同格式）；
+    仍以文字訊框傳送，維持既有 JSON 客戶端相容。
+    """
+    return orjson.dumps(message).decode()
+
+
+async def _receive_frame(websocket: WebSocket) -> Union[str, bytes]:
+    """
+    接收一則客戶端訊息，文字與二進位訊框皆可
+    
+    二進位訊框內容同樣為 JSON，直接以 bytes 交給解析器，省去解碼為 str 的步驟。
+    """
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    return message.get("bytes") or message.get("text") or ""
+
+
+@lru_cache(maxsize=1024)
+def _welcome_parts(document_id: str) -> Tuple[str, str]:
+    """
+    文件連接歡迎訊息的前後綴（依 document_id 快取），發送時只需填入時間戳記
+    
+    document_id 來自 URL，經 orjson 轉義後才嵌入。
+    """
+    quoted_id = orjson.dumps(document_id).decode()
+    message = orjson.dumps(f"Subscribed to updates for document {document_id}").decode()
+    prefix = f'{{"type":"connection_established","document_id":{quoted_id},"timestamp":'
+    return prefix, f',"message":{message}}}'
+
+
+def _is_ping(data: Union[str, bytes]) -> bool:
+    """
+    以子字串比對快速判斷心跳訊息，不需先解析 JSON
+    
+    客戶端限制：非心跳訊息中不可出現 "ping" 字串值，否則會被視為心跳。
+    """
+    if isinstance(data, bytes):
+        return b'"ping"' in data
+    return '"ping"' in data
+
+
 # 連接管理
 class ConnectionManager:
     def __init__(self):
-        # document_id -> set of websockets
-        self.document_connections: Dict[str, Set[WebSocket]] = {}
-        # websocket -> document_id
-        self.websocket_documents: Dict[WebSocket, str] = {}
+        # document_id -> list of websockets（連續陣列，發送時迭代與複製快照較快）
+        self.document_connections: Dict[str, List[WebSocket]] = {}
+        # websocket -> (document_id, 在該文件連接清單中的位置)
+        self.websocket_index: Dict[WebSocket, Tuple[str, int]] = {}
+        # 連接數於連接與斷開時增減，統計端點不需重新加總
+        self.total_connections = 0
+        self.connection_counts: Dict[str, int] = {}
+        # websocket -> 待發送佇列與負責寫出的背景任務
+        self.send_queues: Dict[WebSocket, asyncio.Queue] = {}
+        self.writers: Dict[WebSocket, asyncio.Task] = {}
+        # 進行中的關閉任務（保留參考避免任務被回收）
+        self.closing: Set[asyncio.Task] = set()
 
     async def connect(self, websocket: WebSocket, document_id: str):
+        # 不需另行設定 TCP_NODELAY：asyncio 與 uvloop 建立 TCP 連線時已預設停用 Nagle；
+        # ASGI 介面也不提供底層 socket，無法逐連接調整 SO_SNDBUF
         await websocket.accept()
         
-        if document_id not in self.document_connections:
-            self.document_connections[document_id] = set()
+        connections = self.document_connections.setdefault(document_id, [])
+        self.websocket_index[websocket] = (document_id, len(connections))
+        connections.append(websocket)
+        self.total_connections += 1
+        self.connection_counts[document_id] = len(connections)
         
-        self.document_connections[document_id].add(websocket)
-        self.websocket_documents[websocket] = document_id
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+        self.send_queues[websocket] = queue
+        self.writers[websocket] = asyncio.create_task(self._writer(websocket, queue))
         
         logger.info(f"WebSocket connected for document {document_id}")
 
     def disconnect(self, websocket: WebSocket):
-        document_id = self.websocket_documents.get(websocket)
-        if document_id:
-            self.document_connections[document_id].discard(websocket)
-            if not self.document_connections[document_id]:
+        self.send_queues.pop(websocket, None)
+        writer = self.writers.pop(websocket, None)
+        if writer is not None and writer is not asyncio.current_task():
+            writer.cancel()
+        
+        entry = self.websocket_index.pop(websocket, None)
+        if entry:
+            document_id, index = entry
+            connections = self.document_connections[document_id]
+            # 與最後一個元素交換後移除，O(1) 且不需雜湊集合
+            last = connections.pop()
+            if last is not websocket:
+                connections[index] = last
+                self.websocket_index[last] = (document_id, index)
+            self.total_connections -= 1
+            if connections:
+                self.connection_counts[document_id] = len(connections)
+            else:
                 del self.document_connections[document_id]
-            del self.websocket_documents[websocket]
+                del self.connection_counts[document_id]
             logger.info(f"WebSocket disconnected for document {document_id}")
 
+    def _drop(self, websocket: WebSocket):
+        """取消訂閱並實際關閉連接，使端點的接收迴圈結束、客戶端得以重新連線"""
+        self.disconnect(websocket)
+        task = asyncio.create_task(self._close(websocket))
+        self.closing.add(task)
+        task.add_done_callback(self.closing.discard)
+
+    @staticmethod
+    async def _close(websocket: WebSocket):
+        try:
+            await websocket.close(code=SLOW_CONSUMER_CLOSE_CODE)
+        except Exception:
+            pass  # 連接可能已由客戶端關閉
+
+    async def _writer(self, websocket: WebSocket, queue: asyncio.Queue):
+        """
+        單一連接的寫出任務：依序取出佇列中的訊息並發送
+        
+        喚醒時若佇列已累積多則訊息，合併為一則
+        {"type": "batch", "items": [...]} 訊息一次送出，減少訊框數量。
+        """
+        while True:
+            payload = await queue.get()
+            if not queue.empty():
+                batch = [payload]
+                while not queue.empty():
+                    batch.append(queue.get_nowait())
+                # 各訊息已是 JSON 字串，直接拼接即可，不需重新序列化
+                payload = '{"type":"batch","items":[' + ",".join(batch) + "]}"
+            try:
+                await websocket.send_text(payload)
+            except Exception as e:
+                logger.warning(f"Failed to send message to websocket: {e}")
+                self._drop(websocket)
+                return
+
+    def send_personal(self, websocket: WebSocket, payload: str):
+        """將已序列化的訊息放入單一連接的佇列（不等待實際發送）"""
+        queue = self.send_queues.get(websocket)
+        if queue is None:
+            return
+        try:
+            queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            logger.warning("WebSocket send queue full, closing slow subscriber")
+            self._drop(websocket)
+
     async def send_to_document(self, document_id: str, message: dict):
         """發送訊息給訂閱特定文件的所有連接"""
         if document_id in self.document_connections:
-            disconnected = []
-            for websocket in self.document_connections[document_id]:
-                try:
-                    await websocket.send_text(json.dumps(message))
-                except Exception as e:
-                    logger.warning(f"Failed to send message to websocket: {e}")
-                    disconnected.append(websocket)
-            
-            # 清理斷開的連接
-            for ws in disconnected:
-                self.disconnect(ws)
+            await self.send_to_document_raw(document_id, _dumps(message))
+
+    async def _send_all(self, websockets: List[WebSocket], payload: str):
+        """
+        將訊息放入多個連接的佇列，實際發送由各連接的寫出任務負責，
+        緩慢的客戶端不會阻塞發布者；超過批次大小時在批次間讓出事件迴圈
+        """
+        for start in range(0, len(websockets), BROADCAST_BATCH_SIZE):
+            for websocket in websockets[start:start + BROADCAST_BATCH_SIZE]:
+                self.send_personal(websocket, payload)
+            if len(websockets) > BROADCAST_BATCH_SIZE:
+                await asyncio.sleep(0)
+
+    async def send_to_document_raw(self, document_id: str, payload: str):
+        """發送已序列化的訊息給訂閱特定文件的所有連接（所有連接共用同一份內容）"""
+        if document_id in self.document_connections:
+            # 先取快照，避免發送期間連接增減導致清單在迭代中變動
+            await self._send_all(list(self.document_connections[document_id]), payload)
 
     async def broadcast(self, message: dict):
         """廣播訊息給所有連接"""
-        for document_connections in self.document_connections.values():
-            for websocket in document_connections:
-                try:
-                    await websocket.send_text(json.dumps(message))
-                except Exception:
-                    pass  # 忽略發送失敗
+        await self.broadcast_raw(_dumps(message))
+
+    async def broadcast_raw(self, payload: str):
+        """廣播已序列化的訊息給所有連接"""
+        await self._send_all(list(self.websocket_index), payload)
 
 manager = ConnectionManager()
 
+# Redis 背景通道（settings.WS_REDIS_BACKPLANE 啟用時才建立）
+_redis: Optional[aioredis.Redis] = None
+_listener_task: Optional[asyncio.Task] = None
+# 監聽任務目前是否已完成訂閱；未訂閱期間發布的訊息本行程收不到，改為本地發送
+_subscribed = False
+
+# 監聽中斷後重新訂閱的退避秒數（指數成長至上限）
+BACKPLANE_RETRY_INITIAL_SECONDS = 1
+BACKPLANE_RETRY_MAX_SECONDS = 30
+
+# 進行中的快取清除通知任務（保留參考避免任務被回收）
+_invalidation_tasks: Set[asyncio.Task] = set()
+
+
+async def _forward(message: dict) -> None:
+    """將背景通道收到的訊息轉送給本行程的連接"""
+    # 每則訊息在每個 worker 只解碼一次，之後所有連接共用同一字串
+    channel = message["channel"].decode()
+    payload = message["data"].decode()
+    if channel == CACHE_INVALIDATION_CHANNEL:
+        # 本行程發出的通知也會收到，重複清除無妨
+        response_cache.clear(None if payload == "*" else payload, propagate=False)
+    elif channel == GLOBAL_CHANNEL:
+        await manager.broadcast_raw(payload)
+    else:
+        await manager.send_to_document_raw(channel[len(DOCUMENT_CHANNEL_PREFIX):], payload)
+
+
+async def _listen() -> None:
+    """
+    接收其他 worker 發布的推播，轉送給本行程的連接
+    
+    Redis 連線中斷時記錄錯誤，並以指數退避重新訂閱。
+    """
+    global _subscribed
+    delay = BACKPLANE_RETRY_INITIAL_SECONDS
+    while True:
+        pubsub = _redis.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(GLOBAL_CHANNEL, CACHE_INVALIDATION_CHANNEL)
+            await pubsub.psubscribe(f"{DOCUMENT_CHANNEL_PREFIX}*")
+            _subscribed = True
+            delay = BACKPLANE_RETRY_INITIAL_SECONDS
+            logger.info("WebSocket Redis backplane subscribed")
+            
+            async for message in pubsub.listen():
+                try:
+                    await _forward(message)
+                except Exception as e:
+                    logger.error(f"Failed to forward backplane message: {e}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"WebSocket Redis backplane listener failed, retrying in {delay}s: {e}")
+        finally:
+            _subscribed = False
+            try:
+                await pubsub.reset()
+            except Exception:
+                pass  # 連線已中斷時重設可能失敗
+        
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, BACKPLANE_RETRY_MAX_SECONDS)
+
+
+async def start_backplane() -> None:
+    """啟動 Redis pub/sub 背景通道（未啟用時略過；訂閱於背景任務中進行）"""
+    global _redis, _listener_task
+    if not settings.WS_REDIS_BACKPLANE or _listener_task is not None:
+        return
+    
+    _redis = aioredis.from_url(settings.REDIS_URL)
+    _listener_task = asyncio.create_task(_listen())
+    response_cache.on_clear = _propagate_cache_clear
+    logger.info("WebSocket Redis backplane started")
+
+
+async def stop_backplane() -> None:
+    """停止 Redis pub/sub 背景通道"""
+    global _redis, _listener_task
+    response_cache.on_clear = None
+    if _listener_task is not None:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"WebSocket Redis backplane listener exited with error: {e}")
+        _listener_task = None
+    if _redis is not None:
+        try:
+            await _redis.close()
+        except Exception as e:
+            logger.error(f"Failed to close WebSocket Redis backplane connection: {e}")
+        _redis = None
+
+
+async def _publish(channel: str, payload: bytes) -> bool:
+    """
+    發布到 Redis 背景通道
+    
+    未啟用、本行程的監聽任務未訂閱（已結束或重新連線中）或發布失敗時回傳 False，
+    由呼叫端改為本地發送，避免訊息在本行程遺失。
+    """
+    if _redis is None or not _subscribed or _listener_task is None or _listener_task.done():
+        return False
+    try:
+        await _redis.publish(channel, payload)
+        return True
+    except Exception as e:
+        logger.error(f"Failed to publish to backplane, delivering locally: {e}")
+        return False
+
+
+def _propagate_cache_clear(namespace: Optional[str]) -> None:
+    """將回應快取清除事件發布給其他 worker（由同步的 clear() 呼叫，於背景任務中發布）"""
+    task = asyncio.create_task(_publish(CACHE_INVALIDATION_CHANNEL, (namespace or "*").encode()))
+    _invalidation_tasks.add(task)
+    task.add_done_callback(_invalidation_tasks.discard)
+
 
 @router.websocket("/ws/{document_id}")
 async def websocket_endpoint(websocket: WebSocket, document_id: str):
@@ -74,27 +351,23 @@ async def websocket_endpoint(websocket: WebSocket, document_id: str):
     
     try:
         # 發送歡迎訊息
-        welcome_message = {
-            "type": "connection_established",
-            "document_id": document_id,
-            "timestamp": datetime.utcnow().isoformat(),
-            "message": f"Subscribed to updates for document {document_id}"
-        }
-        await websocket.send_text(json.dumps(welcome_message))
+        prefix, suffix = _welcome_parts(document_id)
+        # 經由佇列發送，與推播訊息共用同一個寫出任務，避免並行寫入同一連接
+        manager.send_personal(websocket, prefix + str(time.time_ns()) + suffix)
         
-        # 保持連接活躍
+        # 保持連接活躍：連線存活由伺服器的協定層 ping 維持，
+        # 此迴圈是該連接唯一的讀取者，用來偵測關閉並回應舊客戶端的應用層 ping
         while True:
             try:
                 # 接收客戶端訊息（心跳包）
-                data = await websocket.receive_text()
-                message = json.loads(data)
+                data = await _receive_frame(websocket)
+                if _is_ping(data):
+                    manager.send_personal(websocket, PONG_PREFIX + str(time.time_ns()) + PONG_SUFFIX)
+                    continue
                 
-                if message.get("type") == "ping":
-                    pong_message = {
-                        "type": "pong",
-                        "timestamp": datetime.utcnow().isoformat()
-                    }
-                    await websocket.send_text(json.dumps(pong_message))
+                # 非心跳訊息才進行解析（格式錯誤時中斷連接）；
+                # 之後新增的訊息處理若含阻塞操作（資料庫查詢、檔案讀取等），須經由 run_in_threadpool 執行
+                orjson.loads(data)
                     
             except WebSocketDisconnect:
                 break
@@ -115,25 +388,19 @@ async def global_websocket_endpoint(websocket: WebSocket):
     
     try:
         # 發送歡迎訊息
-        welcome_message = {
-            "type": "global_connection_established",
-            "timestamp": datetime.utcnow().isoformat(),
-            "message": "Subscribed to global system events"
-        }
-        await websocket.send_text(json.dumps(welcome_message))
+        await websocket.send_text(GLOBAL_WELCOME_PREFIX + str(time.time_ns()) + GLOBAL_WELCOME_SUFFIX)
         
         # 保持連接
         while True:
             try:
-                data = await websocket.receive_text()
-                message = json.loads(data)
+                data = await _receive_frame(websocket)
+                if _is_ping(data):
+                    await websocket.send_text(PONG_PREFIX + str(time.time_ns()) + PONG_SUFFIX)
+                    continue
                 
-                if message.get("type") == "ping":
-                    pong_message = {
-                        "type": "pong",
-                        "timestamp": datetime.utcnow().isoformat()
-                    }
-                    await websocket.send_text(json.dumps(pong_message))
+                # 非心跳訊息才進行解析（格式錯誤時中斷連接）；
+                # 之後新增的訊息處理若含阻塞操作（資料庫查詢、檔案讀取等），須經由 run_in_threadpool 執行
+                orjson.loads(data)
                     
             except WebSocketDisconnect:
                 break
@@ -147,14 +414,22 @@ async def global_websocket_endpoint(websocket: WebSocket):
 
 # 用於其他服務調用的通知函數
 async def notify_document_update(document_id: str, event_type: str, data: dict):
-    """通知文件狀態更新"""
+    """
+    通知文件狀態更新
+    
+    訂閱者連線時已指定文件，訊息不重複攜帶 document_id；
+    timestamp 為 Unix epoch 奈秒整數，與 pong、歡迎訊息一致。
+    """
     message = {
         "type": event_type,
-        "document_id": document_id,
         "data": data,
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": time.time_ns()
     }
-    await manager.send_to_document(document_id, message)
+    # 序列化一次後以 bytes 直接發布，Redis 客戶端不需再次編碼
+    payload = orjson.dumps(message)
+    # 啟用背景通道時由各 worker（包含本行程）的監聽任務發送
+    if not await _publish(f"{DOCUMENT_CHANNEL_PREFIX}{document_id}", payload):
+        await manager.send_to_document_raw(document_id, payload.decode())
 
 
 async def notify_system_event(event_type: str, data: dict):
@@ -162,9 +437,11 @@ async def notify_system_event(event_type: str, data: dict):
     message = {
         "type": event_type,
         "data": data,
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": time.time_ns()
     }
-    await manager.broadcast(message)
+    payload = orjson.dumps(message)
+    if not await _publish(GLOBAL_CHANNEL, payload):
+        await manager.broadcast_raw(payload.decode())
 
 
 @router.get("/ws/stats")
@@ -172,12 +449,9 @@ async def get_websocket_stats():
     """取得 WebSocket 連接統計"""
     try:
         stats = {
-            "active_connections": sum(len(connections) for connections in manager.document_connections.values()),
-            "documents_with_subscribers": len(manager.document_connections),
-            "connections_by_document": {
-                doc_id: len(connections) 
-                for doc_id, connections in manager.document_connections.items()
-            }
+            "active_connections": manager.total_connections,
+            "documents_with_subscribers": len(manager.connection_counts),
+            "connections_by_document": dict(manager.connection_counts)
         }
         
         return stats
@@ -1,30 +1,94 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 
 from fastapi import APIRouter, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from .application.dtos.health_check import HealthCheckResponse
+from .core.config import settings
+from .infrastructure.database import base as database
 from .infrastructure.web.classification import router as classification_router
 from .infrastructure.web.health import router as health_router
+from .infrastructure.web.limits import BodySizeLimitMiddleware
 from .infrastructure.web.processing import router as processing_router
 from .infrastructure.web.review import router as review_router
 from .infrastructure.web.security import router as security_router  # 假設安全路由存在
+from .infrastructure.web.settings import (close_http_client,
+                                           start_resource_sampler,
+                                           stop_resource_sampler)
 from .infrastructure.web.settings import router as settings_router
 from .infrastructure.web.storage import router as storage_router
 from .infrastructure.web.templates import router as templates_router
 from .infrastructure.web.uploads import router as uploads_router
 from .infrastructure.web.versions import router as versions_router
 from .infrastructure.web.webhooks import router as webhooks_router
+from .infrastructure.web.websockets import start_backplane, stop_backplane
 from .infrastructure.web.websockets import router as websockets_router
 
 # 配置日誌
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+def _init_database() -> None:
+    """初始化資料庫並預先建立一條連線，避免第一個請求承擔連線成本"""
+    database.init_database()
+    try:
+        with database.engine.connect():
+            pass
+    except Exception as e:
+        logger.warning(f"Database connection warmup failed: {e}")
+
+
+async def _init_async_database() -> None:
+    """初始化非同步資料庫引擎並預先建立一條連線（範本、版本等路由使用）"""
+    database.init_async_database()
+    try:
+        async with database.async_engine.connect():
+            pass
+    except Exception as e:
+        logger.warning(f"Async database connection warmup failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """應用程式啟動與關閉流程"""
+    logger.info("應用程式啟動中...")
+    # 同步資料庫初始化移至執行緒中，與非同步引擎、WebSocket 背景通道並行啟動
+    await asyncio.gather(
+        asyncio.to_thread(_init_database),
+        _init_async_database(),
+        start_backplane()
+    )
+    logger.info("資料庫初始化完成")
+    start_resource_sampler()
+    
+    yield
+    
+    logger.info("應用程式關閉中...")
+    stop_resource_sampler()
+    await stop_backplane()
+    await close_http_client()
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
+    # TODO: 關閉同步數據庫連接、任務佇列等
+
+
 app = FastAPI(
     title="文件驗證服務 API",
     description="提供文件上傳、簽名檢測、篡改檢測、完整性驗證、審計日誌等功能。",
     version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
+
+# 限制請求主體大小（檔案上限外保留 1MB 給 multipart 表單欄位）
+# 須在 CORS 之前加入，讓 CORS 包在外層，413/400 回應才會帶有 CORS 標頭
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_body_size=(settings.MAX_FILE_SIZE_MB + 1) * 1024 * 1024,
 )
 
 # 配置 CORS
@@ -65,17 +129,3 @@ app.include_router(api_router)
 @app.get("/", response_model=HealthCheckResponse, summary="應用程式根路徑")
 async def read_root():
     return HealthCheckResponse(status="ok", message="文件驗證服務正在運行！")
-
-# 其他應用程式啟動或關閉事件，例如數據庫連接
-@app.on_event("startup")
-async def startup_event():
-    logger.info("應用程式啟動中...")
-    # 初始化資料庫連接
-    from .infrastructure.database.base import init_database
-    init_database()
-    logger.info("資料庫初始化完成")
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    logger.info("應用程式關閉中...")
-    # TODO: 關閉數據庫連接、任務佇列等